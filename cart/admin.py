@@ -1,6 +1,6 @@
 from django.contrib import admin
 from .models import *
 
-admin.site.register([Cart, CartItem])
+admin.site.register([Cart, CartItem, IdempotencyKey])
 
 # Register your models here.
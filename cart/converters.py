@@ -0,0 +1,12 @@
+class CartReferenceConverter:
+    """
+    Identifica un carrito en la URL: un ID numérico es un carrito de la base
+    de datos y cualquier otro valor es el session_id de un carrito efímero.
+    """
+    regex = r'[A-Za-z0-9_-]{1,64}'
+
+    def to_python(self, value):
+        return int(value) if value.isdigit() else value
+
+    def to_url(self, value):
+        return str(value)
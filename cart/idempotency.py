@@ -0,0 +1,127 @@
+"""
+Soporte de la cabecera Idempotency-Key para los endpoints que crean datos.
+
+La primera petición con una clave inserta un registro "en curso"; la
+restricción única (key, scope) hace que un duplicado concurrente falle al
+insertar en lugar de esperar un bloqueo. Al terminar se guarda la respuesta
+y los reintentos la reciben tal cual (cuerpo, código y cabeceras como
+ETag), sin tocar las tablas del carrito.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+# Cabeceras de la respuesta original que forman parte del resultado
+# (ETag: versión del carrito para usar en If-Match)
+REPLAYED_HEADERS = ('ETag', 'Location')
+
+
+def _request_hash(request):
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _is_final(response):
+    """Las respuestas 5xx y los conflictos de stock (409) pueden reintentarse con la misma clave"""
+    return response.status_code < 500 and response.status_code != status.HTTP_409_CONFLICT
+
+
+def _claim(key, scope, request_hash):
+    """
+    Registra la clave como en curso. Devuelve (registro, True) si esta
+    petición la obtuvo o (registro existente, False) si ya estaba usada.
+    """
+    now = timezone.now()
+    pending_until = now + timedelta(seconds=settings.CART_IDEMPOTENCY_PENDING_TIMEOUT)
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(
+                    key=key, scope=scope, request_hash=request_hash, expires_at=pending_until,
+                ), True
+        except IntegrityError:
+            record = IdempotencyKey.objects.filter(key=key, scope=scope).first()
+            if record is not None and record.expires_at > now:
+                return record, False
+            # Expiró (o se liberó entre medio): se descarta y se vuelve a intentar
+            IdempotencyKey.objects.filter(key=key, scope=scope, expires_at__lte=now).delete()
+    return IdempotencyKey.objects.get(key=key, scope=scope), False
+
+
+def _replay(record, request_hash):
+    if record.request_hash != request_hash:
+        return Response(
+            {'error': f'La {HEADER} ya se usó con una petición distinta'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    if record.status_code is None:
+        return Response(
+            {'error': f'Una petición con esta {HEADER} todavía está en curso'},
+            status=status.HTTP_409_CONFLICT
+        )
+    response = Response(record.response_body, status=record.status_code)
+    for name, value in record.response_headers.items():
+        response[name] = value
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view_method):
+    """
+    Decorador para métodos de APIView. Sin la cabecera Idempotency-Key la
+    vista se ejecuta normalmente.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view_method(self, request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'{HEADER} debe tener entre 1 y {MAX_KEY_LENGTH} caracteres'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        request_hash = _request_hash(request)
+        record, claimed = _claim(key, f'{request.method} {request.path}', request_hash)
+        if not claimed:
+            return _replay(record, request_hash)
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+
+        if _is_final(response):
+            record.status_code = response.status_code
+            record.response_body = response.data
+            record.response_headers = {
+                name: response[name] for name in REPLAYED_HEADERS if response.has_header(name)
+            }
+            record.expires_at = timezone.now() + timedelta(seconds=settings.CART_IDEMPOTENCY_TTL)
+            record.save(update_fields=['status_code', 'response_body', 'response_headers', 'expires_at'])
+        else:
+            record.delete()
+        return response
+
+    return wrapper
+
+
+def purge_expired_idempotency_keys():
+    """Elimina los registros vencidos; devuelve cuántos se borraron"""
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
@@ -0,0 +1,73 @@
+import re
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from cart.idempotency import purge_expired_idempotency_keys
+from cart.models import Cart
+from cart.services import purge_cart_batch
+
+AGE_UNITS = {'s': 'seconds', 'm': 'minutes', 'h': 'hours', 'd': 'days', 'w': 'weeks'}
+
+
+def parse_age(value):
+    """'30d', '12h', '45m'... a timedelta"""
+    match = re.fullmatch(r'(\d+)([smhdw])', value.strip())
+    if match is None:
+        raise CommandError(f'Antigüedad inválida: "{value}". Ejemplos: 30d, 12h, 45m')
+    return timedelta(**{AGE_UNITS[match.group(2)]: int(match.group(1))})
+
+
+class Command(BaseCommand):
+    help = (
+        'Eliminar por lotes los carritos sin guardar sin actividad reciente, devolviendo al stock '
+        'lo que tenían reservado'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', required=True, help='Antigüedad mínima de la última actividad (p. ej. 30d, 12h)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Carritos eliminados por transacción')
+        parser.add_argument('--sleep', type=float, default=0.1, help='Segundos de pausa entre lotes')
+        parser.add_argument('--every', type=int, default=0, help='Repetir cada N segundos (0 = una sola vez)')
+        parser.add_argument('--dry-run', action='store_true', help='Solo contar los carritos que se eliminarían')
+
+    def purge(self, age, batch_size, pause):
+        cutoff = timezone.now() - age
+        carts = items = 0
+        started = time.perf_counter()
+        while True:
+            batch_carts, batch_items = purge_cart_batch(cutoff, batch_size)
+            carts += batch_carts
+            items += batch_items
+            if batch_carts < batch_size:
+                break
+            # Pausa para no acaparar la base de datos en producción
+            time.sleep(pause)
+        keys = purge_expired_idempotency_keys()
+        elapsed = time.perf_counter() - started
+
+        rate = (carts + items) / elapsed if elapsed else 0
+        self.stdout.write(
+            f'Carritos eliminados: {carts} ({items} items) en {elapsed:.2f}s, {rate:.0f} filas/s; '
+            f'claves de idempotencia vencidas: {keys}'
+        )
+
+    def handle(self, *args, **options):
+        age = parse_age(options['older_than'])
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size debe ser mayor a 0')
+
+        if options['dry_run']:
+            count = Cart.objects.filter(is_saved=False, updated_at__lt=timezone.now() - age).count()
+            self.stdout.write(f'Se eliminarían {count} carritos sin guardar')
+            return
+
+        while True:
+            self.purge(age, options['batch_size'], options['sleep'])
+            if not options['every']:
+                break
+            time.sleep(options['every'])
+
+        self.stdout.write(self.style.SUCCESS('\n✓ Carritos abandonados eliminados'))
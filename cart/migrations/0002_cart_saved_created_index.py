@@ -0,0 +1,17 @@
+# Generated by Django 5.2.10 on 2026-10-18 10:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(fields=['is_saved', '-created_at', '-id'], name='cart_saved_created_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.10 on 2026-10-18 10:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0004_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(fields=['is_saved', 'updated_at'], name='cart_saved_updated_idx'),
+        ),
+    ]
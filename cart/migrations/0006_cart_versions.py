@@ -0,0 +1,39 @@
+# Generated by Django 5.2.10 on 2026-10-18 10:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0005_cart_saved_updated_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='version',
+            field=models.PositiveIntegerField(default=1, verbose_name='Versión'),
+        ),
+        migrations.AddField(
+            model_name='cartitem',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.CreateModel(
+            name='RemovedCartItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_id', models.PositiveBigIntegerField()),
+                ('version', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('cart', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='removed_items', to='cart.cart')),
+            ],
+            options={
+                'verbose_name': 'Item eliminado',
+                'verbose_name_plural': 'Items eliminados',
+                'indexes': [models.Index(fields=['cart', 'version'], name='cart_removed_version_idx')],
+            },
+        ),
+    ]
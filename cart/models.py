@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from products.models import Product
 # Create your models here.
@@ -7,21 +8,36 @@ class Cart(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_saved = models.BooleanField(default=False, verbose_name="Guardado")
+    # Se incrementa con cada cambio en los items (ver cart.services.bump_cart_version)
+    version = models.PositiveIntegerField(default=1, verbose_name="Versión")
 
     class Meta:
         verbose_name = "Carrito"
         verbose_name_plural = "Carritos"
         ordering = ['-created_at']
+        indexes = [
+            # Listado paginado por cursor de carritos guardados (CartListView)
+            models.Index(fields=['is_saved', '-created_at', '-id'], name='cart_saved_created_idx'),
+            # Búsqueda por lotes de carritos abandonados (purge_carts)
+            models.Index(fields=['is_saved', 'updated_at'], name='cart_saved_updated_idx'),
+        ]
 
     def __str__(self):
         return f"Carrito #{self.id} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
 
+    # Si la consulta anotó los totales (ver cart.services.with_cart_totals)
+    # se usan esos valores y no se recorren los items
+
     @property
     def total(self):
+        if hasattr(self, 'items_total'):
+            return self.items_total
         return sum(item.subtotal for item in self.items.all())
 
     @property
     def total_items(self):
+        if hasattr(self, 'items_count'):
+            return self.items_count
         return sum(item.quantity for item in self.items.all())
 
 
@@ -29,6 +45,10 @@ class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
+    # Unidades descontadas de Product.stock por este item (ver cart.stock)
+    reserved_quantity = models.PositiveIntegerField(default=0, verbose_name="Stock reservado")
+    # Versión del carrito en la que el item cambió por última vez
+    version = models.PositiveIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -42,4 +62,52 @@ class CartItem(models.Model):
 
     @property
     def subtotal(self):
-        return self.product.price * self.quantity
\ No newline at end of file
+        return self.product.price * self.quantity
+
+
+class RemovedCartItem(models.Model):
+    """
+    Registro de un item eliminado, para que las lecturas incrementales
+    (?since_version=) informen las bajas. Se borra junto con el carrito.
+    """
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='removed_items')
+    item_id = models.PositiveBigIntegerField()
+    version = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Item eliminado"
+        verbose_name_plural = "Items eliminados"
+        indexes = [
+            models.Index(fields=['cart', 'version'], name='cart_removed_version_idx'),
+        ]
+
+    def __str__(self):
+        return f"Item #{self.item_id} del carrito #{self.cart_id} (v{self.version})"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Respuesta registrada para una cabecera Idempotency-Key (ver cart.idempotency).
+    Mientras la petición original se procesa `status_code` es nulo.
+    """
+    key = models.CharField(max_length=255)
+    # Método y ruta de la petición: la misma clave puede usarse en endpoints distintos
+    scope = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    # Cabeceras de la respuesta que se repiten en los reintentos (p. ej. ETag)
+    response_headers = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = "Clave de idempotencia"
+        verbose_name_plural = "Claves de idempotencia"
+        constraints = [
+            models.UniqueConstraint(fields=['key', 'scope'], name='cart_idempotency_key_scope_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} [{self.key}]"
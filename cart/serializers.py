@@ -1,16 +1,19 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import Cart, CartItem
-from products.serializers import ProductSerializer
+from .store import is_valid_session_id
+from products.fieldsets import SparseFieldsetMixin
+from products.serializers import CompiledProductField
 
-class CartItemSerializer(serializers.ModelSerializer):
-    product = ProductSerializer(read_only=True)
+class CartItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    product = CompiledProductField()
     product_id = serializers.IntegerField(write_only=True)
     subtotal = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
 
     class Meta:
         model = CartItem
-        fields = ['id', 'product', 'product_id', 'quantity', 'subtotal', 'created_at']
-        read_only_fields = ['id', 'created_at']
+        fields = ['id', 'product', 'product_id', 'quantity', 'subtotal', 'version', 'created_at']
+        read_only_fields = ['id', 'version', 'created_at']
 
     def validate_quantity(self, value):
         if value < 1:
@@ -18,15 +21,67 @@ class CartItemSerializer(serializers.ModelSerializer):
         return value
 
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
     total = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     total_items = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Cart
-        fields = ['id', 'session_id', 'items', 'total', 'total_items', 'is_saved', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        fields = [
+            'id', 'session_id', 'items', 'total', 'total_items', 'is_saved', 'version', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'version', 'created_at', 'updated_at']
+
+
+class EphemeralCartSerializer(CartSerializer):
+    """Carrito efímero (sin guardar): su identificador es el session_id"""
+    id = serializers.CharField(read_only=True)
+
+
+class CartDeltaSerializer(CartSerializer):
+    """
+    Cambios de un carrito desde `since_version`: solo los items creados o
+    modificados después y los IDs de los eliminados, con los totales actuales
+    """
+    since_version = serializers.IntegerField(read_only=True)
+    removed = serializers.ListField(child=serializers.IntegerField(), read_only=True)
+
+    class Meta(CartSerializer.Meta):
+        fields = ['id', 'version', 'since_version', 'items', 'removed', 'total', 'total_items', 'updated_at']
+        read_only_fields = fields
+
+
+class CartDeltaParamsSerializer(serializers.Serializer):
+    since_version = serializers.IntegerField(required=False, min_value=0)
+
+
+class CartSummarySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Representación liviana para listados: totales sin items"""
+    total = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    total_items = serializers.IntegerField(read_only=True)
+    item_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Cart
+        fields = [
+            'id', 'session_id', 'total', 'total_items', 'item_count', 'is_saved', 'version', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
+class CartFilterSerializer(serializers.Serializer):
+    """Filtros del listado de carritos recibidos por query params"""
+    session_id = serializers.CharField(required=False, max_length=255)
+    created_after = serializers.DateTimeField(required=False, input_formats=['iso-8601', '%Y-%m-%d'])
+    created_before = serializers.DateTimeField(required=False, input_formats=['iso-8601', '%Y-%m-%d'])
+
+    def validate(self, data):
+        after = data.get('created_after')
+        before = data.get('created_before')
+        if after is not None and before is not None and after > before:
+            raise serializers.ValidationError("'created_after' no puede ser posterior a 'created_before'")
+        return data
 
 
 class SaveCartSerializer(serializers.Serializer):
@@ -34,8 +89,16 @@ class SaveCartSerializer(serializers.Serializer):
         child=serializers.DictField(
             child=serializers.IntegerField()
         ),
-        allow_empty=False
+        allow_empty=False,
+        required=False
     )
+    # Alternativa a `items`: guardar el carrito efímero de esta sesión
+    session_id = serializers.CharField(max_length=64, required=False)
+
+    def validate(self, data):
+        if ('items' in data) == ('session_id' in data):
+            raise serializers.ValidationError("Debe indicar 'items' o 'session_id' (solo uno de los dos)")
+        return data
 
     def validate_items(self, value):
         for item in value:
@@ -47,4 +110,51 @@ class SaveCartSerializer(serializers.Serializer):
                 raise serializers.ValidationError(
                     "La cantidad debe ser al menos 1"
                 )
-        return value
\ No newline at end of file
+        return value
+
+
+class CartItemQuantitySerializer(serializers.Serializer):
+    """Cuerpo de PATCH /api/cart/<pk>/items/<item_id>/quantity/"""
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class CreateCartSerializer(serializers.Serializer):
+    session_id = serializers.CharField(max_length=64, required=False)
+
+    def validate_session_id(self, value):
+        if not is_valid_session_id(value):
+            raise serializers.ValidationError(
+                "Solo letras, números, '-' y '_' (máximo 64), no puede ser solo numérico "
+                "ni coincidir con una ruta del carrito ('save', 'create')"
+            )
+        return value
+
+
+class CartOperationSerializer(serializers.Serializer):
+    """Una operación de PATCH /api/cart/<pk>/items/"""
+    REQUIRED_FIELDS = {
+        'add': ('product_id', 'quantity'),
+        'set': ('item_id', 'quantity'),
+        'remove': ('item_id',),
+    }
+
+    op = serializers.ChoiceField(choices=list(REQUIRED_FIELDS))
+    product_id = serializers.IntegerField(required=False)
+    item_id = serializers.IntegerField(required=False)
+    quantity = serializers.IntegerField(required=False, min_value=1)
+
+    def validate(self, data):
+        missing = [field for field in self.REQUIRED_FIELDS[data['op']] if field not in data]
+        if missing:
+            raise serializers.ValidationError(
+                {field: [f"Requerido para la operación '{data['op']}'"] for field in missing}
+            )
+        return data
+
+
+class CartOperationsSerializer(serializers.Serializer):
+    operations = CartOperationSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=settings.CART_MAX_OPERATIONS
+    )
@@ -0,0 +1,310 @@
+"""
+Lógica de negocio del carrito
+"""
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, F, IntegerField, Prefetch, Sum, Value
+from django.db.models.functions import Coalesce, Now
+from django.utils import timezone
+
+from products.models import Product
+from products.serializers import compiled_product_serializer
+from .models import Cart, CartItem, RemovedCartItem
+from .stock import release_stock
+
+# Columnas de CartItem que siempre se leen (claves y cálculo de subtotales)
+CART_ITEM_COLUMNS = ['id', 'cart', 'product', 'quantity', 'version', 'created_at']
+
+
+def _requested(name, fields=None, omit=None):
+    """Indica si el campo de primer nivel `name` forma parte de la respuesta"""
+    if fields is not None and name not in fields:
+        return False
+    return omit is None or omit.get(name) != {}
+
+
+def _nested_product_columns(fields=None, omit=None):
+    """
+    Columnas de Product que requiere items.product según los árboles
+    fields/omit de la petición (ver products.fieldsets.parse_fieldset).
+    """
+    items_fields = None if fields is None else fields.get('items')
+    items_omit = None if omit is None else omit.get('items')
+
+    if fields is not None and items_fields is None:
+        return []
+    if items_omit == {}:
+        return []
+    if items_fields and 'product' not in items_fields:
+        return []
+    if items_omit and items_omit.get('product') == {}:
+        return []
+
+    product = compiled_product_serializer.project(
+        (items_fields or {}).get('product') or None,
+        (items_omit or {}).get('product') or None,
+        prefix='items.product.',
+    )
+    return product.sources
+
+
+def cart_items_prefetch(fields=None, omit=None, since_version=None):
+    """
+    Prefetch de los items con su producto en un solo JOIN, leyendo del
+    producto solo las columnas pedidas más el precio (necesario para los
+    subtotales). Con `since_version` solo los items modificados después.
+    """
+    product_columns = {'id', 'price', *_nested_product_columns(fields, omit)}
+    queryset = CartItem.objects.select_related('product').only(
+        *CART_ITEM_COLUMNS,
+        *(f'product__{column}' for column in sorted(product_columns)),
+    )
+    if since_version is not None:
+        queryset = queryset.filter(version__gt=since_version)
+    return Prefetch('items', queryset=queryset)
+
+
+def with_cart_totals(queryset, fields=None, omit=None, summary=False):
+    """
+    Anota `items_total` e `items_count` calculados en SQL (una agregación
+    agrupada por carrito), que Cart.total y Cart.total_items usan en lugar de
+    recorrer los items, y para el resumen `item_count` (líneas distintas).
+    Solo se anota lo que la respuesta incluye.
+    """
+    annotations = {}
+    if _requested('total', fields, omit):
+        annotations['items_total'] = Coalesce(
+            Sum(F('items__quantity') * F('items__product__price')),
+            Value(Decimal('0')),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        )
+    if _requested('total_items', fields, omit):
+        annotations['items_count'] = Coalesce(
+            Sum('items__quantity'), Value(0), output_field=IntegerField()
+        )
+    if summary and _requested('item_count', fields, omit):
+        annotations['item_count'] = Count('items')
+    return queryset.annotate(**annotations) if annotations else queryset
+
+
+def cart_queryset(fields=None, omit=None, summary=False, since_version=None):
+    """
+    Carritos listos para CartSerializer con un número fijo de consultas sin
+    importar cuántos items tengan: los totales vienen anotados y los items
+    (con su producto) se cargan en un único prefetch, solo si se piden.
+    Con `summary` el queryset es para CartSummarySerializer (sin items) y con
+    `since_version` solo se cargan los items modificados después.
+    """
+    queryset = with_cart_totals(Cart.objects.all(), fields, omit, summary=summary)
+    if not summary and _requested('items', fields, omit):
+        queryset = queryset.prefetch_related(cart_items_prefetch(fields, omit, since_version))
+    return queryset
+
+
+def removed_item_ids(cart_id, since_version):
+    """IDs de los items eliminados del carrito después de `since_version`"""
+    return list(
+        RemovedCartItem.objects.filter(cart_id=cart_id, version__gt=since_version)
+        .order_by('version', 'item_id')
+        .values_list('item_id', flat=True)
+    )
+
+
+def record_removed_items(cart_id, item_ids, version):
+    RemovedCartItem.objects.bulk_create([
+        RemovedCartItem(cart_id=cart_id, item_id=item_id, version=version) for item_id in item_ids
+    ])
+
+
+def filter_carts(queryset, filters):
+    """Aplica los filtros validados por CartFilterSerializer"""
+    if filters.get('session_id'):
+        queryset = queryset.filter(session_id=filters['session_id'])
+    if filters.get('created_after') is not None:
+        queryset = queryset.filter(created_at__gte=filters['created_after'])
+    if filters.get('created_before') is not None:
+        queryset = queryset.filter(created_at__lte=filters['created_before'])
+    return queryset
+
+
+def group_cart_lines(items):
+    """Suma las cantidades de las líneas repetidas: {product_id: cantidad}"""
+    quantities = {}
+    for item in items:
+        quantities[item['product_id']] = quantities.get(item['product_id'], 0) + item['quantity']
+    return quantities
+
+
+class CartVersionConflict(Exception):
+    """La versión del carrito no coincide con la cabecera If-Match"""
+
+    def __init__(self, version):
+        super().__init__(f'El carrito cambió, la versión actual es {version}')
+        self.version = version
+
+
+def bump_cart_version(cart_id, expected_version=None):
+    """
+    Incrementa la versión del carrito al cambiar sus items y marca su
+    actividad (updated_at, que usa purge_carts para detectar carritos
+    abandonados). El UPDATE bloquea la fila, de modo que las modificaciones
+    de un mismo carrito se serializan. Devuelve la nueva versión o None si el
+    carrito no existe; con `expected_version` lanza CartVersionConflict si
+    otro cambio se adelantó.
+    """
+    carts = Cart.objects.filter(pk=cart_id)
+    target = carts if expected_version is None else carts.filter(version=expected_version)
+    if not target.update(version=F('version') + 1, updated_at=Now()):
+        current = carts.values_list('version', flat=True).first()
+        if current is None:
+            return None
+        raise CartVersionConflict(current)
+    return carts.values_list('version', flat=True).get()
+
+
+def upsert_cart_item(cart_id, product_id, quantity, version):
+    """
+    Suma `quantity` unidades (ya reservadas) del producto al carrito con una
+    sola sentencia INSERT ... ON CONFLICT (cart_id, product_id) DO UPDATE,
+    de modo que dos altas simultáneas del mismo producto no chocan con
+    unique_together. `version` es la nueva versión del carrito. Devuelve
+    (item, creado), con el item armado a partir de la fila que devuelve
+    RETURNING y sin el producto cargado.
+    """
+    features = connection.features
+    if not (features.supports_update_conflicts_with_target and features.can_return_rows_from_bulk_insert):
+        # Motores sin ON CONFLICT ... RETURNING (p. ej. MySQL)
+        item, created = CartItem.objects.get_or_create(
+            cart_id=cart_id,
+            product_id=product_id,
+            defaults={'quantity': quantity, 'reserved_quantity': quantity, 'version': version}
+        )
+        if not created:
+            CartItem.objects.filter(pk=item.pk).update(
+                quantity=F('quantity') + quantity,
+                reserved_quantity=F('reserved_quantity') + quantity,
+                version=version,
+                updated_at=Now(),
+            )
+            item.refresh_from_db()
+        return item, created
+
+    table = connection.ops.quote_name(CartItem._meta.db_table)
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    # En PostgreSQL xmax = 0 solo en la fila recién insertada; en el resto
+    # de motores se compara created_at = updated_at
+    inserted = 'xmax = 0' if connection.vendor == 'postgresql' else 'created_at = updated_at'
+    # raw() aplica los conversores de cada columna (fechas en SQLite)
+    item = CartItem.objects.raw(
+        f"""
+        INSERT INTO {table} (cart_id, product_id, quantity, reserved_quantity, version, created_at, updated_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (cart_id, product_id) DO UPDATE SET
+            quantity = {table}.quantity + EXCLUDED.quantity,
+            reserved_quantity = {table}.reserved_quantity + EXCLUDED.reserved_quantity,
+            version = EXCLUDED.version,
+            updated_at = EXCLUDED.updated_at
+        RETURNING id, cart_id, product_id, quantity, reserved_quantity, version, created_at, updated_at,
+            ({inserted}) AS inserted
+        """,
+        [cart_id, product_id, quantity, quantity, version, now, now],
+    )[0]
+    return item, bool(item.inserted)
+
+
+def purge_cart_batch(cutoff, batch_size):
+    """
+    Elimina hasta `batch_size` carritos sin guardar sin actividad desde
+    `cutoff`, devolviendo al stock lo que sus items tenían reservado. Cada
+    lote es una transacción corta; los carritos bloqueados por otra
+    operación se saltan. Devuelve (carritos, items) eliminados.
+    """
+    with transaction.atomic():
+        cart_ids = list(
+            Cart.objects.select_for_update(skip_locked=True)
+            .filter(is_saved=False, updated_at__lt=cutoff)
+            .order_by('updated_at')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not cart_ids:
+            return 0, 0
+
+        reserved = (
+            CartItem.objects.filter(cart_id__in=cart_ids, reserved_quantity__gt=0)
+            .values('product_id')
+            .annotate(total=Sum('reserved_quantity'))
+        )
+        release_stock({row['product_id']: row['total'] for row in reserved})
+
+        items, _ = CartItem.objects.filter(cart_id__in=cart_ids).delete()
+        carts, _ = Cart.objects.filter(pk__in=cart_ids).delete()
+    return carts, items
+
+
+def apply_cart_operations(items, operations):
+    """
+    Aplica en orden las operaciones add/set/remove sobre los items actuales
+    ({'id', 'product_id', 'quantity'}) sin escribir nada. Devuelve las
+    cantidades finales {product_id: cantidad} y un error por cada operación
+    que referencia un item inexistente.
+    """
+    products_by_item = {item['id']: item['product_id'] for item in items}
+    quantities = {item['product_id']: item['quantity'] for item in items}
+    errors = []
+    for operation in operations:
+        if operation['op'] == 'add':
+            product_id = operation['product_id']
+            quantities[product_id] = quantities.get(product_id, 0) + operation['quantity']
+            continue
+
+        product_id = products_by_item.get(operation['item_id'])
+        if product_id is None or product_id not in quantities:
+            errors.append({
+                'item_id': operation['item_id'],
+                'code': 'not_found',
+                'error': f'Item con ID {operation["item_id"]} no encontrado',
+            })
+        elif operation['op'] == 'set':
+            quantities[product_id] = operation['quantity']
+        else:
+            del quantities[product_id]
+    return quantities, errors
+
+
+def ephemeral_cart_instance(cart, fields=None, omit=None):
+    """
+    Objeto con los mismos atributos que un Cart con sus items, para
+    serializar un carrito efímero con EphemeralCartSerializer. Los productos
+    se leen en una sola consulta; los que ya no existen se omiten. Los
+    carritos efímeros no se versionan (version es None).
+    """
+    product_columns = {'id', 'price', *_nested_product_columns(fields, omit)}
+    products = Product.objects.only(*product_columns).in_bulk(
+        [item['product_id'] for item in cart['items']]
+    ) if cart['items'] else {}
+
+    items = [
+        SimpleNamespace(
+            id=item['id'],
+            product=products[item['product_id']],
+            quantity=item['quantity'],
+            subtotal=products[item['product_id']].price * item['quantity'],
+            version=None,
+            created_at=item['created_at'],
+        )
+        for item in cart['items']
+        if item['product_id'] in products
+    ]
+    return SimpleNamespace(
+        id=cart['session_id'],
+        session_id=cart['session_id'],
+        items=items,
+        total=sum((item.subtotal for item in items), Decimal('0')),
+        total_items=sum(item.quantity for item in items),
+        is_saved=False,
+        version=None,
+        created_at=cart['created_at'],
+        updated_at=cart['updated_at'],
+    )
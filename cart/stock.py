@@ -0,0 +1,188 @@
+"""
+Reserva de stock para los items del carrito.
+
+Cada CartItem guarda en `reserved_quantity` las unidades que descontó de
+Product.stock; al eliminar el item o el carrito esas unidades se devuelven.
+Las funciones que reservan o liberan deben llamarse dentro de
+transaction.atomic().
+"""
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Now
+
+from products.cache import bump_catalog_version_on_commit, invalidate_product_detail
+from products.models import Product
+
+
+class StockConflict(Exception):
+    """El stock cambió entre la lectura bloqueada y la actualización"""
+
+
+def _quantity_case(quantities):
+    return Case(
+        *[When(pk=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+        output_field=IntegerField(),
+    )
+
+
+def _lock_products(product_ids, **filters):
+    """
+    Bloquea las filas en orden de ID, de modo que dos operaciones sobre los
+    mismos productos siempre esperan en el mismo orden y no hay deadlocks.
+    """
+    return (
+        Product.objects.select_for_update()
+        .filter(pk__in=product_ids, **filters)
+        .order_by('pk')
+        .values('id', 'name', 'stock', 'is_active')
+    )
+
+
+def _stock_changed(product_ids):
+    # update() no emite señales: se invalidan las cachés del catálogo a mano
+    bump_catalog_version_on_commit()
+    for product_id in product_ids:
+        invalidate_product_detail(product_id)
+
+
+def _stock_errors(quantities, rows):
+    """Un error por cada línea cuyo producto no existe o no tiene stock suficiente"""
+    products = {row['id']: row for row in rows}
+    errors = []
+    for product_id, quantity in quantities.items():
+        product = products.get(product_id)
+        if product is None:
+            errors.append({
+                'product_id': product_id,
+                'code': 'not_found',
+                'error': f'Producto con ID {product_id} no encontrado',
+            })
+        elif product['stock'] < quantity:
+            errors.append({
+                'product_id': product_id,
+                'code': 'insufficient_stock',
+                'error': f'Stock insuficiente para {product["name"]}. Disponible: {product["stock"]}',
+            })
+    return errors
+
+
+def check_stock(quantities):
+    """
+    Valida {product_id: cantidad} contra el stock actual sin bloquear ni
+    descontar nada (carritos efímeros, que todavía no reservan).
+    """
+    return _stock_errors(
+        quantities,
+        Product.objects.filter(pk__in=quantities, is_active=True).values('id', 'name', 'stock'),
+    )
+
+
+def _take_stock(quantities):
+    """
+    Descuenta las cantidades ya validadas con un único UPDATE condicional;
+    una cantidad negativa devuelve unidades al stock.
+    """
+    quantity = _quantity_case(quantities)
+    updated = Product.objects.filter(pk__in=quantities, stock__gte=quantity).update(
+        stock=F('stock') - quantity,
+        updated_at=Now(),
+    )
+    # Con bloqueo de filas no puede fallar; protege a motores sin SELECT ... FOR UPDATE
+    if updated != len(quantities):
+        raise StockConflict('El stock cambió durante la operación, intente nuevamente')
+
+    _stock_changed(quantities)
+
+
+def reserve_stock(quantities):
+    """
+    Descuenta del stock {product_id: cantidad} de forma atómica: bloquea los
+    productos activos, valida todas las líneas y aplica un único UPDATE
+    condicional (stock >= cantidad). Si alguna línea no alcanza no se
+    modifica nada y se devuelven todos los errores.
+    """
+    quantities = {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+    if not quantities:
+        return []
+
+    errors = _stock_errors(quantities, _lock_products(quantities, is_active=True))
+    if errors:
+        return errors
+
+    _take_stock(quantities)
+    return []
+
+
+def reserve_product_stock(product_id, quantity, fields=()):
+    """
+    reserve_stock de un único producto que además devuelve la fila bloqueada
+    (con `fields` cargados y el stock ya descontado), para armar la respuesta
+    sin volver a leer el producto. Devuelve (producto o None, errores).
+    """
+    products = list(
+        Product.objects.select_for_update()
+        .filter(pk=product_id, is_active=True)
+        .only('id', 'name', 'stock', *fields)
+    )
+    errors = _stock_errors(
+        {product_id: quantity},
+        [{'id': product.pk, 'name': product.name, 'stock': product.stock} for product in products],
+    )
+    if errors:
+        return None, errors
+
+    _take_stock({product_id: quantity})
+    product = products[0]
+    product.stock -= quantity
+    return product, []
+
+
+def release_stock(quantities):
+    """Devuelve al stock {product_id: cantidad} previamente reservado"""
+    quantities = {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+    if not quantities:
+        return
+
+    list(_lock_products(quantities))
+    quantity = _quantity_case(quantities)
+    Product.objects.filter(pk__in=quantities).update(
+        stock=F('stock') + quantity,
+        updated_at=Now(),
+    )
+    _stock_changed(quantities)
+
+
+def apply_stock_deltas(deltas):
+    """
+    Aplica {product_id: diferencia} en un solo paso: las diferencias
+    positivas se reservan y las negativas se liberan. Todos los productos
+    se bloquean juntos y en orden de ID (reservar y liberar por separado los
+    bloquearía en dos tandas, y dos lotes con los productos cruzados podrían
+    esperarse mutuamente). Si alguna reserva no alcanza no se modifica nada
+    y se devuelven todos los errores.
+    """
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+    if not deltas:
+        return []
+
+    rows = list(_lock_products(deltas))
+    errors = _stock_errors(
+        {product_id: delta for product_id, delta in deltas.items() if delta > 0},
+        [row for row in rows if row['is_active']],
+    )
+    if errors:
+        return errors
+
+    # Lo que se libera de un producto ya eliminado no tiene dónde volver
+    _take_stock({row['id']: deltas[row['id']] for row in rows})
+    return []
+
+
+def adjust_stock(product_id, reserved, quantity):
+    """
+    Lleva la reserva de un item de `reserved` a `quantity` unidades,
+    reservando o liberando solo la diferencia.
+    """
+    if quantity > reserved:
+        return reserve_stock({product_id: quantity - reserved})
+    release_stock({product_id: reserved - quantity})
+    return []
@@ -0,0 +1,177 @@
+"""
+Almacenamiento de carritos sin guardar (efímeros) fuera de la base de datos.
+
+Un carrito efímero es un diccionario identificado por su session_id:
+
+    {'session_id': str, 'items': [{'id', 'product_id', 'quantity', 'created_at'}],
+     'next_item_id': int, 'created_at': datetime, 'updated_at': datetime}
+
+Solo se escribe en Cart/CartItem cuando se guarda (SaveCartView).
+"""
+import re
+import secrets
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+# Mismo formato que acepta la URL (ver cart.converters); nunca solo dígitos
+SESSION_ID_RE = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+# Rutas de cart/urls.py que se resuelven antes que cart/<cart:pk>/
+RESERVED_SESSION_IDS = frozenset({'save', 'create'})
+
+
+def is_valid_session_id(value):
+    return (
+        bool(SESSION_ID_RE.fullmatch(value))
+        and not value.isdigit()
+        and value not in RESERVED_SESSION_IDS
+    )
+
+
+def new_session_id():
+    while True:
+        session_id = secrets.token_urlsafe(16)
+        if is_valid_session_id(session_id):
+            return session_id
+
+
+class CartLocked(APIException):
+    """Otra petición está modificando el mismo carrito efímero"""
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'El carrito se está modificando en otra petición, intente nuevamente'
+    default_code = 'cart_locked'
+
+
+class BaseCartStore:
+    """
+    Interfaz de los backends de carritos efímeros (ver settings.CART_STORE).
+    Toda lectura-modificación-escritura de un carrito debe hacerse dentro de
+    `lock(session_id)`, para que dos peticiones simultáneas no pisen sus
+    cambios.
+    """
+
+    def lock(self, session_id):
+        raise NotImplementedError
+
+    def get(self, session_id):
+        raise NotImplementedError
+
+    def save(self, cart):
+        raise NotImplementedError
+
+    def delete(self, session_id):
+        raise NotImplementedError
+
+    def create(self, session_id=None):
+        now = timezone.now()
+        cart = {
+            'session_id': session_id or new_session_id(),
+            'items': [],
+            'next_item_id': 1,
+            'created_at': now,
+            'updated_at': now,
+        }
+        self.save(cart)
+        return cart
+
+
+class CacheCartStore(BaseCartStore):
+    """
+    Guarda cada carrito en la caché de Django (locmem o archivo en desarrollo,
+    un backend compartido como Redis en producción). El TTL se renueva con
+    cada modificación, de modo que solo expiran los carritos abandonados.
+    """
+    key_prefix = 'cart:ephemeral:'
+
+    def __init__(self):
+        self.cache = caches[settings.CART_STORE_CACHE_ALIAS]
+        self.timeout = settings.CART_STORE_TIMEOUT
+
+    def _key(self, session_id):
+        return f'{self.key_prefix}{session_id}'
+
+    @contextmanager
+    def lock(self, session_id):
+        """
+        Candado por sesión con cache.add (atómico en los backends de caché):
+        se reintenta hasta CART_STORE_LOCK_WAIT segundos y expira solo a los
+        CART_STORE_LOCK_TIMEOUT segundos si el proceso que lo tiene muere.
+        """
+        # ':' no es válido en un session_id, la clave no choca con un carrito
+        key = f'{self.key_prefix}lock:{session_id}'
+        token = secrets.token_hex(8)
+        deadline = time.monotonic() + settings.CART_STORE_LOCK_WAIT
+        while not self.cache.add(key, token, timeout=settings.CART_STORE_LOCK_TIMEOUT):
+            if time.monotonic() >= deadline:
+                raise CartLocked()
+            time.sleep(0.01)
+        try:
+            yield
+        finally:
+            if self.cache.get(key) == token:
+                self.cache.delete(key)
+
+    def get(self, session_id):
+        return self.cache.get(self._key(session_id))
+
+    def save(self, cart):
+        cart['updated_at'] = timezone.now()
+        self.cache.set(self._key(cart['session_id']), cart, timeout=self.timeout)
+
+    def delete(self, session_id):
+        self.cache.delete(self._key(session_id))
+
+
+_store = None
+
+
+def get_cart_store():
+    global _store
+    if _store is None:
+        _store = import_string(settings.CART_STORE)()
+    return _store
+
+
+def get_item(cart, item_id):
+    return next((item for item in cart['items'] if item['id'] == item_id), None)
+
+
+def get_product_item(cart, product_id):
+    return next((item for item in cart['items'] if item['product_id'] == product_id), None)
+
+
+def add_item(cart, product_id, quantity):
+    """Agrega la línea o suma la cantidad si el producto ya está; devuelve (item, creado)"""
+    item = get_product_item(cart, product_id)
+    if item is not None:
+        item['quantity'] += quantity
+        return item, False
+
+    item = {
+        'id': cart['next_item_id'],
+        'product_id': product_id,
+        'quantity': quantity,
+        'created_at': timezone.now(),
+    }
+    cart['next_item_id'] += 1
+    cart['items'].append(item)
+    return item, True
+
+
+def remove_item(cart, item_id):
+    cart['items'] = [item for item in cart['items'] if item['id'] != item_id]
+
+
+def set_quantities(cart, quantities):
+    """Deja el carrito con exactamente las cantidades {product_id: cantidad}"""
+    cart['items'] = [item for item in cart['items'] if item['product_id'] in quantities]
+    for product_id, quantity in quantities.items():
+        item, _ = add_item(cart, product_id, quantity)
+        item['quantity'] = quantity
@@ -1,3 +1,312 @@
-from django.test import TestCase
+import hashlib
+import threading
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test import TransactionTestCase, skipUnlessDBFeature
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase
+from rest_framework.views import APIView
+
+from products.models import Product
+from .idempotency import _claim, idempotent
+from .models import Cart, CartItem, IdempotencyKey
+from .services import bump_cart_version, upsert_cart_item
+from .stock import StockConflict, reserve_stock
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class StockReservationConcurrencyTests(TransactionTestCase):
+    """Muchos hilos reservan el mismo producto a la vez: nunca se vende más de lo disponible"""
+    threads = 20
+    attempts = 10
+    initial_stock = 100
+
+    def setUp(self):
+        self.product = Product.objects.create(
+            name='Producto de prueba de concurrencia',
+            description='Reservado desde varios hilos',
+            price=Decimal('1.00'),
+            stock=self.initial_stock,
+        )
+        self.carts = [Cart.objects.create(session_id=f'concurrency-{index}') for index in range(self.threads)]
+
+    def _worker(self, barrier, cart_id, quantity, results, lock):
+        accepted = rejected = 0
+        try:
+            barrier.wait()
+            for _ in range(self.attempts):
+                try:
+                    with transaction.atomic():
+                        version = bump_cart_version(cart_id)
+                        if reserve_stock({self.product.pk: quantity}):
+                            transaction.set_rollback(True)
+                            rejected += 1
+                            continue
+                        upsert_cart_item(cart_id, self.product.pk, quantity, version)
+                    accepted += 1
+                except StockConflict:
+                    rejected += 1
+        finally:
+            connection.close()
+            with lock:
+                results['accepted'] += accepted
+                results['rejected'] += rejected
+
+    def _run(self, quantity):
+        results = {'accepted': 0, 'rejected': 0}
+        lock = threading.Lock()
+        barrier = threading.Barrier(self.threads)
+        workers = [
+            threading.Thread(target=self._worker, args=(barrier, cart.pk, quantity, results, lock))
+            for cart in self.carts
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return results
+
+    def _assert_consistent(self, results, quantity):
+        self.product.refresh_from_db()
+        reserved = CartItem.objects.filter(product=self.product).aggregate(
+            total=Sum('reserved_quantity')
+        )['total'] or 0
+
+        self.assertGreaterEqual(self.product.stock, 0)
+        self.assertEqual(self.product.stock + reserved, self.initial_stock)
+        self.assertEqual(results['accepted'] * quantity, reserved)
+        self.assertEqual(results['accepted'] + results['rejected'], self.threads * self.attempts)
+
+    def test_no_overselling_single_units(self):
+        results = self._run(quantity=1)
+        self._assert_consistent(results, quantity=1)
+        # Hay más intentos que stock: todo el stock termina reservado
+        self.assertEqual(self.product.stock, 0)
+
+    def test_no_overselling_multiple_units(self):
+        results = self._run(quantity=3)
+        self._assert_consistent(results, quantity=3)
+        self.assertLess(self.product.stock, 3)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class CrossedBatchConcurrencyTests(TransactionTestCase):
+    """Dos lotes que reservan y liberan los mismos productos en sentido opuesto no se bloquean mutuamente"""
+    rounds = 100
+
+    def setUp(self):
+        self.products = [
+            Product.objects.create(name=f'Producto {index}', description='Lote cruzado', price=Decimal('1.00'), stock=50)
+            for index in range(2)
+        ]
+        client = APIClient()
+        self.carts = []
+        for _ in range(2):
+            response = client.post('/api/cart/save/', {
+                'items': [{'product_id': product.pk, 'quantity': 1} for product in self.products]
+            }, format='json')
+            cart = response.json()['cart']
+            self.carts.append((cart['id'], {item['product']['id']: item['id'] for item in cart['items']}))
+
+    def _worker(self, barrier, cart, crossed, statuses):
+        cart_id, items = cart
+        first, second = self.products if not crossed else self.products[::-1]
+        client = APIClient()
+        try:
+            barrier.wait()
+            for round_number in range(self.rounds):
+                # En rondas pares sube el primero y baja el segundo, en impares al revés
+                up, down = (first, second) if round_number % 2 == 0 else (second, first)
+                response = client.patch(f'/api/cart/{cart_id}/items/', {'operations': [
+                    {'op': 'set', 'item_id': items[up.pk], 'quantity': 2},
+                    {'op': 'set', 'item_id': items[down.pk], 'quantity': 1},
+                ]}, format='json')
+                statuses.append(response.status_code)
+        finally:
+            connection.close()
+
+    def test_crossed_batches_do_not_deadlock(self):
+        statuses = []
+        barrier = threading.Barrier(2)
+        workers = [
+            threading.Thread(target=self._worker, args=(barrier, cart, crossed, statuses))
+            for cart, crossed in zip(self.carts, (False, True))
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(statuses, [200] * (2 * self.rounds))
+        for product in self.products:
+            product.refresh_from_db()
+            reserved = CartItem.objects.filter(product=product).aggregate(total=Sum('reserved_quantity'))['total']
+            self.assertEqual(product.stock + reserved, 50)
+
+
+class _CreatedView(APIView):
+    """Vista mínima que responde con ETag y Location, para probar la repetición de cabeceras"""
+    calls = 0
+
+    @idempotent
+    def post(self, request):
+        _CreatedView.calls += 1
+        response = Response({'id': _CreatedView.calls}, status=status.HTTP_201_CREATED)
+        response['ETag'] = f'"{_CreatedView.calls}"'
+        response['Location'] = f'/api/things/{_CreatedView.calls}/'
+        return response
+
+
+class IdempotencyTests(APITestCase):
+    def setUp(self):
+        self.product = Product.objects.create(
+            name='Producto idempotente', description='Reintentos', price=Decimal('2.50'), stock=10
+        )
+        self.body = {'items': [{'product_id': self.product.pk, 'quantity': 2}]}
+
+    def test_replay_returns_original_status_and_body(self):
+        first = self.client.post('/api/cart/save/', self.body, format='json', HTTP_IDEMPOTENCY_KEY='k1')
+        retry = self.client.post('/api/cart/save/', self.body, format='json', HTTP_IDEMPOTENCY_KEY='k1')
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertFalse(first.has_header('Idempotent-Replayed'))
+        # El reintento no vuelve a crear el carrito ni a reservar stock
+        self.assertEqual(Cart.objects.count(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 8)
+
+    def test_replay_keeps_etag(self):
+        cart_id = self.client.post('/api/cart/save/', self.body, format='json').json()['cart']['id']
+        item = {'product_id': self.product.pk, 'quantity': 1}
+        first = self.client.post(f'/api/cart/{cart_id}/items/', item, format='json', HTTP_IDEMPOTENCY_KEY='add')
+        retry = self.client.post(f'/api/cart/{cart_id}/items/', item, format='json', HTTP_IDEMPOTENCY_KEY='add')
+
+        self.assertEqual(retry.status_code, first.status_code)
+        self.assertEqual(retry['ETag'], first['ETag'])
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(CartItem.objects.get(cart_id=cart_id).quantity, 3)
+
+    def test_replay_keeps_location(self):
+        _CreatedView.calls = 0
+        view = _CreatedView.as_view()
+        factory = APIRequestFactory()
+        first = view(factory.post('/api/things/', {'name': 'a'}, format='json', HTTP_IDEMPOTENCY_KEY='loc'))
+        retry = view(factory.post('/api/things/', {'name': 'a'}, format='json', HTTP_IDEMPOTENCY_KEY='loc'))
+
+        self.assertEqual(_CreatedView.calls, 1)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['ETag'], first['ETag'])
+        self.assertEqual(retry['Location'], first['Location'])
+
+    def test_reused_key_with_different_body_is_rejected(self):
+        self.client.post('/api/cart/save/', self.body, format='json', HTTP_IDEMPOTENCY_KEY='k1')
+        other = {'items': [{'product_id': self.product.pk, 'quantity': 3}]}
+        response = self.client.post('/api/cart/save/', other, format='json', HTTP_IDEMPOTENCY_KEY='k1')
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Cart.objects.count(), 1)
+
+    def test_same_key_on_another_endpoint_is_independent(self):
+        self.client.post('/api/cart/save/', self.body, format='json', HTTP_IDEMPOTENCY_KEY='k1')
+        response = self.client.post('/api/cart/create/', {}, format='json', HTTP_IDEMPOTENCY_KEY='k1')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+
+    def test_duplicate_claim_loses_the_race(self):
+        # La segunda inserción choca con la restricción única (key, scope) y recibe el registro existente
+        record, claimed = _claim('k1', 'POST /api/cart/save/', 'hash')
+        duplicate, duplicate_claimed = _claim('k1', 'POST /api/cart/save/', 'hash')
+
+        self.assertTrue(claimed)
+        self.assertFalse(duplicate_claimed)
+        self.assertEqual(duplicate.pk, record.pk)
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+    def test_key_in_progress_answers_conflict(self):
+        IdempotencyKey.objects.create(
+            key='k1', scope='POST /api/cart/create/', request_hash=hashlib.sha256(b'{}').hexdigest(),
+            expires_at=timezone.now() + timedelta(seconds=60),
+        )
+        response = self.client.post('/api/cart/create/', {}, format='json', HTTP_IDEMPOTENCY_KEY='k1')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_expired_key_is_claimed_again(self):
+        record, _ = _claim('k1', 'POST /api/cart/save/', 'hash')
+        IdempotencyKey.objects.filter(pk=record.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        fresh, claimed = _claim('k1', 'POST /api/cart/save/', 'other')
+
+        self.assertTrue(claimed)
+        self.assertNotEqual(fresh.pk, record.pk)
+        self.assertEqual(fresh.request_hash, 'other')
+
+    def test_invalid_key_length(self):
+        response = self.client.post('/api/cart/save/', self.body, format='json', HTTP_IDEMPOTENCY_KEY='x' * 300)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AddCartItemTests(APITestCase):
+    """Alta de items por INSERT ... ON CONFLICT ... RETURNING (ver upsert_cart_item)"""
+
+    def setUp(self):
+        self.product = Product.objects.create(
+            name='Producto agregado', description='Alta y suma', price=Decimal('2.50'), stock=10
+        )
+        self.other = Product.objects.create(
+            name='Otro producto', description='Alta y suma', price=Decimal('1.00'), stock=10
+        )
+        response = self.client.post('/api/cart/save/', {
+            'items': [{'product_id': self.other.pk, 'quantity': 1}]
+        }, format='json')
+        self.cart_id = response.json()['cart']['id']
+        self.url = f'/api/cart/{self.cart_id}/items/'
+
+    def test_first_add_creates_the_item(self):
+        response = self.client.post(self.url, {'product_id': self.product.pk, 'quantity': 2}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        item = response.json()['item']
+        self.assertEqual(item['quantity'], 2)
+        self.assertEqual(item['subtotal'], '5.00')
+        self.assertEqual(item['product']['stock'], 8)
+        self.assertEqual(response['ETag'], f'"{item["version"]}"')
+
+        stored = CartItem.objects.get(pk=item['id'])
+        self.assertEqual((stored.quantity, stored.reserved_quantity, stored.version), (2, 2, item['version']))
+
+    def test_repeated_add_sums_the_quantity(self):
+        first = self.client.post(self.url, {'product_id': self.product.pk, 'quantity': 2}, format='json').json()['item']
+        response = self.client.post(self.url, {'product_id': self.product.pk, 'quantity': 3}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        item = response.json()['item']
+        self.assertEqual(item['id'], first['id'])
+        self.assertEqual(item['quantity'], 5)
+        self.assertEqual(item['created_at'], first['created_at'])
+        self.assertGreater(item['version'], first['version'])
+        self.assertEqual(item['product']['stock'], 5)
+
+        stored = CartItem.objects.get(pk=item['id'])
+        self.assertEqual((stored.quantity, stored.reserved_quantity), (5, 5))
+        # La respuesta armada desde RETURNING coincide con lo que devuelve el detalle del carrito
+        cart_items = self.client.get(f'/api/cart/{self.cart_id}/').json()['items']
+        self.assertIn(item, cart_items)
+
+    def test_add_without_stock_changes_nothing(self):
+        response = self.client.post(self.url, {'product_id': self.product.pk, 'quantity': 11}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(CartItem.objects.filter(cart_id=self.cart_id, product=self.product).exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 10)
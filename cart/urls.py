@@ -1,4 +1,6 @@
-from django.urls import path
+from django.urls import path, register_converter
+
+from .converters import CartReferenceConverter
 from .views import (
     SaveCartView,
     CartListView,
@@ -9,17 +11,20 @@ from .views import (
     CreateCartView,
 )
 
+register_converter(CartReferenceConverter, 'cart')
+
 urlpatterns = [
     # Guardar carrito (endpoint principal para el frontend)
     path('cart/save/', SaveCartView.as_view(), name='save-cart'),
+    # Debe ir antes de cart/<cart:pk>/, que también aceptaría "create"
+    path('cart/create/', CreateCartView.as_view(), name='cart-create'),
     
     # Listar y obtener carritos
     path('cart/', CartListView.as_view(), name='cart-list'),
-    path('cart/<int:pk>/', CartDetailView.as_view(), name='cart-detail'),
+    path('cart/<cart:pk>/', CartDetailView.as_view(), name='cart-detail'),
     
     # Operaciones con items del carrito
-    path('cart/<int:pk>/items/', AddCartItemView.as_view(), name='cart-add-item'),
-    path('cart/<int:pk>/items/<int:item_id>/', RemoveCartItemView.as_view(), name='cart-remove-item'),
-    path('cart/<int:pk>/items/<int:item_id>/quantity/', UpdateCartItemQuantityView.as_view(), name='cart-update-quantity'),
-    path('cart/create/', CreateCartView.as_view(), name='cart-create'),
+    path('cart/<cart:pk>/items/', AddCartItemView.as_view(), name='cart-add-item'),
+    path('cart/<cart:pk>/items/<int:item_id>/', RemoveCartItemView.as_view(), name='cart-remove-item'),
+    path('cart/<cart:pk>/items/<int:item_id>/quantity/', UpdateCartItemQuantityView.as_view(), name='cart-update-quantity'),
 ]
\ No newline at end of file
@@ -1,12 +1,53 @@
+from contextlib import nullcontext
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status
+from rest_framework import serializers, status
 from django.db import transaction
+from django.http import Http404
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 
+from .idempotency import idempotent
 from .models import Cart, CartItem
-from .serializers import CartSerializer, CartItemSerializer, SaveCartSerializer
-from products.models import Product
+from .serializers import (
+    CartSerializer,
+    CartItemQuantitySerializer,
+    CartItemSerializer,
+    CartDeltaParamsSerializer,
+    CartDeltaSerializer,
+    CartFilterSerializer,
+    CartOperationsSerializer,
+    CartSummarySerializer,
+    CreateCartSerializer,
+    EphemeralCartSerializer,
+    SaveCartSerializer,
+)
+from .services import (
+    CartVersionConflict,
+    apply_cart_operations,
+    bump_cart_version,
+    cart_queryset,
+    ephemeral_cart_instance,
+    filter_carts,
+    group_cart_lines,
+    record_removed_items,
+    removed_item_ids,
+    upsert_cart_item,
+)
+from .stock import (
+    StockConflict,
+    adjust_stock,
+    apply_stock_deltas,
+    check_stock,
+    release_stock,
+    reserve_product_stock,
+    reserve_stock,
+)
+from .store import add_item, get_cart_store, get_item, get_product_item, remove_item, set_quantities
+from products.fieldsets import get_fieldset_params
+from products.pagination import KeysetCursorPagination
+from products.serializers import compiled_product_serializer
 
 # decoradores de documentación
 from docs.decorators.swagger_decorators import (
@@ -15,18 +56,78 @@ from docs.decorators.swagger_decorators import (
     cart_detail_get_decorator,
     cart_detail_delete_decorator,
     add_cart_item_decorator,
+    cart_items_batch_decorator,
     remove_cart_item_decorator,
     update_cart_item_quantity_decorator,
     create_Cart,
 )
 
 
+def stock_error_response(errors):
+    """Respuesta para las líneas rechazadas por cart.stock o por referenciar items inexistentes"""
+    missing = any(error['code'] == 'not_found' for error in errors)
+    return Response(
+        {
+            'error': errors[0]['error'] if len(errors) == 1 else f'{len(errors)} items no pudieron guardarse',
+            'errors': errors
+        },
+        status=status.HTTP_404_NOT_FOUND if missing else status.HTTP_400_BAD_REQUEST
+    )
+
+
+def stock_conflict_response(error):
+    return Response({'error': str(error)}, status=status.HTTP_409_CONFLICT)
+
+
+def version_conflict_response(error):
+    return Response(
+        {'error': str(error), 'version': error.version},
+        status=status.HTTP_409_CONFLICT
+    )
+
+
+def get_if_match(request):
+    """Versión esperada según la cabecera If-Match ("3" o W/"3"); None si no se envía o es *"""
+    value = request.headers.get('If-Match', '').strip()
+    if not value or value == '*':
+        return None
+    version = value.removeprefix('W/').strip('"')
+    if not version.isdigit():
+        raise serializers.ValidationError({'If-Match': ['Debe ser la versión del carrito, p. ej. "3"']})
+    return int(version)
+
+
+def with_version(response, version):
+    """Expone la versión del carrito como ETag para usarla en If-Match"""
+    response['ETag'] = f'"{version}"'
+    return response
+
+
+def is_ephemeral(pk):
+    """Las URLs con un session_id en lugar de un ID numérico son carritos efímeros"""
+    return isinstance(pk, str)
+
+
+def get_ephemeral_cart_or_404(session_id):
+    cart = get_cart_store().get(session_id)
+    if cart is None:
+        raise Http404
+    return cart
+
+
+def ephemeral_item_data(cart, item_id):
+    """Serializa un item de un carrito efímero igual que CartItemSerializer"""
+    items = ephemeral_cart_instance(cart).items
+    return CartItemSerializer(next(item for item in items if item.id == item_id)).data
+
+
 class SaveCartView(APIView):
     """
     POST: Guardar carrito completo desde el frontend
     """
     
     @save_cart_decorator
+    @idempotent
     def post(self, request):
         serializer = SaveCartSerializer(data=request.data)
         
@@ -36,72 +137,92 @@ class SaveCartView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            with transaction.atomic():
-                # Crear nuevo carrito
-                cart = Cart.objects.create(is_saved=True)
+        session_id = serializer.validated_data.get('session_id')
+        # El carrito efímero queda bloqueado hasta que se borra tras guardarlo
+        with get_cart_store().lock(session_id) if session_id else nullcontext():
+            if session_id:
+                # Persistir el carrito efímero de la sesión
+                ephemeral = get_ephemeral_cart_or_404(session_id)
+                if not ephemeral['items']:
+                    return Response(
+                        {'error': 'El carrito está vacío'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                items = ephemeral['items']
+            else:
+                items = serializer.validated_data['items']
+            quantities = group_cart_lines(items)
+
+            try:
+                with transaction.atomic():
+                    # Reservar stock de todas las líneas a la vez; los errores se informan juntos
+                    errors = reserve_stock(quantities)
+                    if errors:
+                        return stock_error_response(errors)
                 
-                # Crear items del carrito
-                items_data = serializer.validated_data['items']
-                created_items = []
+                    # Crear nuevo carrito
+                    cart = Cart.objects.create(is_saved=True, session_id=session_id)
                 
-                for item_data in items_data:
-                    try:
-                        product = Product.objects.get(
-                            id=item_data['product_id'],
-                            is_active=True
-                        )
-                        
-                        # Validar stock
-                        if product.stock < item_data['quantity']:
-                            return Response(
-                                {
-                                    'error': f'Stock insuficiente para {product.name}. Disponible: {product.stock}'
-                                },
-                                status=status.HTTP_400_BAD_REQUEST
-                            )
-                        
-                        cart_item = CartItem.objects.create(
+                    # Crear items del carrito en un solo INSERT
+                    CartItem.objects.bulk_create([
+                        CartItem(
                             cart=cart,
-                            product=product,
-                            quantity=item_data['quantity']
-                        )
-                        created_items.append(cart_item)
-                        
-                    except Product.DoesNotExist:
-                        return Response(
-                            {'error': f'Producto con ID {item_data["product_id"]} no encontrado'},
-                            status=status.HTTP_404_NOT_FOUND
+                            product_id=product_id,
+                            quantity=quantity,
+                            reserved_quantity=quantity
                         )
+                        for product_id, quantity in quantities.items()
+                    ])
+                
+                    if session_id:
+                        transaction.on_commit(lambda: get_cart_store().delete(session_id))
+                
+                    # Serializar respuesta
+                    cart_serializer = CartSerializer(cart_queryset().get(pk=cart.pk))
                 
-                # Serializar respuesta
-                cart_serializer = CartSerializer(cart)
+                    return Response(
+                        {
+                            'message': 'Carrito guardado correctamente',
+                            'cart': cart_serializer.data
+                        },
+                        status=status.HTTP_201_CREATED
+                    )
                 
+            except StockConflict as e:
+                return stock_conflict_response(e)
+            except Exception as e:
                 return Response(
-                    {
-                        'message': 'Carrito guardado correctamente',
-                        'cart': cart_serializer.data
-                    },
-                    status=status.HTTP_201_CREATED
+                    {'error': str(e)},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
                 )
-                
-        except Exception as e:
-            return Response(
-                {'error': str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
 
 
 class CartListView(APIView):
     """
-    GET: Listar todos los carritos guardados
+    GET: Listar los carritos guardados (paginado por cursor, resumen por defecto)
     """
     
     @cart_list_decorator
     def get(self, request):
-        carts = Cart.objects.filter(is_saved=True).order_by('-created_at')
-        serializer = CartSerializer(carts, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        filters = CartFilterSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+        
+        # Los items completos solo se incluyen si se piden con ?include=items
+        summary = request.query_params.get('include') != 'items'
+        serializer_class = CartSummarySerializer if summary else CartSerializer
+        
+        fields, omit = get_fieldset_params(request)
+        # Se valida antes de consultar para responder 400 ante campos desconocidos
+        serializer = serializer_class(many=True, fields=fields, omit=omit)
+        
+        carts = filter_carts(
+            cart_queryset(fields, omit, summary=summary).filter(is_saved=True),
+            filters.validated_data,
+        )
+        paginator = KeysetCursorPagination(ordering='-created_at')
+        page = paginator.paginate_queryset(carts, request, view=self)
+        serializer.instance = page
+        return paginator.get_paginated_response(serializer.data)
 
 
 class CartDetailView(APIView):
@@ -112,14 +233,60 @@ class CartDetailView(APIView):
     
     @cart_detail_get_decorator
     def get(self, request, pk):
-        cart = get_object_or_404(Cart, pk=pk)
-        serializer = CartSerializer(cart)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        fields, omit = get_fieldset_params(request)
+        params = CartDeltaParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        since_version = params.validated_data.get('since_version')
+        
+        if is_ephemeral(pk):
+            if since_version is not None:
+                raise serializers.ValidationError(
+                    {'since_version': ['Solo disponible para carritos guardados']}
+                )
+            cart = ephemeral_cart_instance(get_ephemeral_cart_or_404(pk), fields, omit)
+            serializer = EphemeralCartSerializer(cart, fields=fields, omit=omit)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        
+        if since_version is None:
+            cart = get_object_or_404(cart_queryset(fields, omit), pk=pk)
+            serializer = CartSerializer(cart, fields=fields, omit=omit)
+            return with_version(Response(serializer.data, status=status.HTTP_200_OK), cart.version)
+        
+        # Lectura incremental: solo lo que cambió después de since_version
+        cart = get_object_or_404(cart_queryset(fields, omit, since_version=since_version), pk=pk)
+        cart.since_version = since_version
+        cart.removed = removed_item_ids(pk, since_version) if cart.version > since_version else []
+        serializer = CartDeltaSerializer(cart, fields=fields, omit=omit)
+        return with_version(Response(serializer.data, status=status.HTTP_200_OK), cart.version)
     
     @cart_detail_delete_decorator
     def delete(self, request, pk):
-        cart = get_object_or_404(Cart, pk=pk)
-        cart.delete()
+        if is_ephemeral(pk):
+            store = get_cart_store()
+            with store.lock(pk):
+                get_ephemeral_cart_or_404(pk)
+                store.delete(pk)
+            return Response(
+                {'message': 'Carrito eliminado correctamente'},
+                status=status.HTTP_204_NO_CONTENT
+            )
+        
+        if_match = get_if_match(request)
+        try:
+            with transaction.atomic():
+                # Bloquear el carrito antes de leer sus items, en el mismo orden que
+                # las demás modificaciones: ningún alta concurrente puede colarse
+                # entre la lectura de lo reservado y el borrado
+                if bump_cart_version(pk, if_match) is None:
+                    raise Http404
+                
+                # Devolver al stock lo reservado por los items que se eliminan
+                items = CartItem.objects.select_for_update().filter(cart_id=pk)
+                release_stock(dict(items.values_list('product_id', 'reserved_quantity')))
+                items.delete()
+                Cart.objects.filter(pk=pk).delete()
+        except CartVersionConflict as e:
+            return version_conflict_response(e)
         return Response(
             {'message': 'Carrito eliminado correctamente'},
             status=status.HTTP_204_NO_CONTENT
@@ -129,51 +296,185 @@ class CartDetailView(APIView):
 class AddCartItemView(APIView):
     """
     POST: Agregar item a un carrito existente
+    PATCH: Aplicar varias operaciones sobre los items en una sola transacción
     """
     
     @add_cart_item_decorator
+    @idempotent
     def post(self, request, pk):
-        cart = get_object_or_404(Cart, pk=pk)
+        if is_ephemeral(pk):
+            with get_cart_store().lock(pk):
+                return self.post_ephemeral(request, pk)
+        
         serializer = CartItemSerializer(data=request.data)
         
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
+        product_id = serializer.validated_data['product_id']
+        quantity = serializer.validated_data['quantity']
+        if_match = get_if_match(request)
+        
         try:
-            product = Product.objects.get(id=serializer.validated_data['product_id'])
-            
-            # Verificar stock
-            if product.stock < serializer.validated_data['quantity']:
-                return Response(
-                    {'error': f'Stock insuficiente. Disponible: {product.stock}'},
-                    status=status.HTTP_400_BAD_REQUEST
+            with transaction.atomic():
+                # Subir la versión bloquea el carrito y también comprueba que exista
+                version = bump_cart_version(pk, if_match)
+                if version is None:
+                    raise Http404
+                
+                # Reservar el stock antes de tocar el item; la fila bloqueada
+                # del producto se reutiliza en la respuesta
+                product, errors = reserve_product_stock(
+                    product_id, quantity, compiled_product_serializer.sources
                 )
-            
-            # Verificar si el item ya existe en el carrito
-            cart_item, created = CartItem.objects.get_or_create(
-                cart=cart,
-                product=product,
-                defaults={'quantity': serializer.validated_data['quantity']}
-            )
-            
-            if not created:
-                # Si ya existe, actualizar cantidad
-                cart_item.quantity += serializer.validated_data['quantity']
-                cart_item.save()
-            
-            return Response(
-                {
-                    'message': 'Item agregado correctamente',
-                    'item': CartItemSerializer(cart_item).data
-                },
-                status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
-            )
-            
-        except Product.DoesNotExist:
-            return Response(
-                {'error': 'Producto no encontrado'},
-                status=status.HTTP_404_NOT_FOUND
-            )
+                if errors:
+                    transaction.set_rollback(True)
+                    return stock_error_response(errors)
+                
+                # Crear el item o sumar la cantidad en una sola sentencia
+                cart_item, created = upsert_cart_item(pk, product_id, quantity, version)
+                cart_item.product = product
+        except StockConflict as e:
+            return stock_conflict_response(e)
+        except CartVersionConflict as e:
+            return version_conflict_response(e)
+        
+        return with_version(Response(
+            {
+                'message': 'Item agregado correctamente',
+                'item': CartItemSerializer(cart_item).data
+            },
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        ), version)
+    
+    def post_ephemeral(self, request, session_id):
+        """Carrito sin guardar: se valida el stock pero todavía no se reserva"""
+        cart = get_ephemeral_cart_or_404(session_id)
+        serializer = CartItemSerializer(data=request.data)
+        
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        product_id = serializer.validated_data['product_id']
+        quantity = serializer.validated_data['quantity']
+        current = get_product_item(cart, product_id)
+        
+        errors = check_stock({product_id: quantity + (current['quantity'] if current else 0)})
+        if errors:
+            return stock_error_response(errors)
+        
+        cart_item, created = add_item(cart, product_id, quantity)
+        get_cart_store().save(cart)
+        
+        return Response(
+            {
+                'message': 'Item agregado correctamente',
+                'item': ephemeral_item_data(cart, cart_item['id'])
+            },
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+    
+    @cart_items_batch_decorator
+    def patch(self, request, pk):
+        serializer = CartOperationsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        operations = serializer.validated_data['operations']
+        fields, omit = get_fieldset_params(request)
+        
+        if is_ephemeral(pk):
+            with get_cart_store().lock(pk):
+                return self.patch_ephemeral(pk, operations, fields, omit)
+        
+        if_match = get_if_match(request)
+        try:
+            with transaction.atomic():
+                version = bump_cart_version(pk, if_match)
+                if version is None:
+                    raise Http404
+                
+                items = {
+                    item.product_id: item
+                    for item in CartItem.objects.select_for_update().filter(cart_id=pk).order_by('pk')
+                }
+                quantities, errors = apply_cart_operations(
+                    [{'id': item.pk, 'product_id': item.product_id, 'quantity': item.quantity} for item in items.values()],
+                    operations
+                )
+                if errors:
+                    transaction.set_rollback(True)
+                    return stock_error_response(errors)
+                
+                # Reservar o liberar solo la diferencia con lo ya reservado por cada producto
+                deltas = {
+                    product_id: quantities.get(product_id, 0) - (items[product_id].reserved_quantity if product_id in items else 0)
+                    for product_id in quantities.keys() | items.keys()
+                }
+                errors = apply_stock_deltas(deltas)
+                if errors:
+                    transaction.set_rollback(True)
+                    return stock_error_response(errors)
+                
+                # Una escritura por tipo de cambio
+                now = timezone.now()
+                changed = []
+                for product_id, item in items.items():
+                    quantity = quantities.get(product_id)
+                    if quantity is not None and (item.quantity, item.reserved_quantity) != (quantity, quantity):
+                        item.quantity = item.reserved_quantity = quantity
+                        item.version = version
+                        item.updated_at = now
+                        changed.append(item)
+                removed = [item.pk for product_id, item in items.items() if product_id not in quantities]
+                CartItem.objects.filter(pk__in=removed).delete()
+                record_removed_items(pk, removed, version)
+                CartItem.objects.bulk_update(changed, ['quantity', 'reserved_quantity', 'version', 'updated_at'])
+                CartItem.objects.bulk_create([
+                    CartItem(
+                        cart_id=pk, product_id=product_id, quantity=quantity, reserved_quantity=quantity, version=version
+                    )
+                    for product_id, quantity in quantities.items()
+                    if product_id not in items
+                ])
+        except StockConflict as e:
+            return stock_conflict_response(e)
+        except CartVersionConflict as e:
+            return version_conflict_response(e)
+        
+        return with_version(Response(
+            {
+                'message': 'Carrito actualizado correctamente',
+                'cart': CartSerializer(cart_queryset(fields, omit).get(pk=pk), fields=fields, omit=omit).data
+            },
+            status=status.HTTP_200_OK
+        ), version)
+    
+    def patch_ephemeral(self, session_id, operations, fields, omit):
+        """Carrito sin guardar: se valida el stock de lo que aumenta pero no se reserva"""
+        cart = get_ephemeral_cart_or_404(session_id)
+        current = {item['product_id']: item['quantity'] for item in cart['items']}
+        quantities, errors = apply_cart_operations(cart['items'], operations)
+        if errors:
+            return stock_error_response(errors)
+        
+        errors = check_stock({
+            product_id: quantity for product_id, quantity in quantities.items()
+            if quantity > current.get(product_id, 0)
+        })
+        if errors:
+            return stock_error_response(errors)
+        
+        set_quantities(cart, quantities)
+        get_cart_store().save(cart)
+        
+        return Response(
+            {
+                'message': 'Carrito actualizado correctamente',
+                'cart': EphemeralCartSerializer(
+                    ephemeral_cart_instance(cart, fields, omit), fields=fields, omit=omit
+                ).data
+            },
+            status=status.HTTP_200_OK
+        )
 
 
 class RemoveCartItemView(APIView):
@@ -183,14 +484,37 @@ class RemoveCartItemView(APIView):
     
     @remove_cart_item_decorator
     def delete(self, request, pk, item_id):
-        cart = get_object_or_404(Cart, pk=pk)
-        cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
-        cart_item.delete()
+        if is_ephemeral(pk):
+            store = get_cart_store()
+            with store.lock(pk):
+                cart = get_ephemeral_cart_or_404(pk)
+                if get_item(cart, item_id) is None:
+                    raise Http404
+                remove_item(cart, item_id)
+                store.save(cart)
+            return Response(
+                {'message': 'Item eliminado correctamente'},
+                status=status.HTTP_204_NO_CONTENT
+            )
         
-        return Response(
+        if_match = get_if_match(request)
+        try:
+            with transaction.atomic():
+                version = bump_cart_version(pk, if_match)
+                if version is None:
+                    raise Http404
+                
+                cart_item = get_object_or_404(CartItem.objects.select_for_update(), id=item_id, cart_id=pk)
+                release_stock({cart_item.product_id: cart_item.reserved_quantity})
+                cart_item.delete()
+                record_removed_items(pk, [item_id], version)
+        except CartVersionConflict as e:
+            return version_conflict_response(e)
+        
+        return with_version(Response(
             {'message': 'Item eliminado correctamente'},
             status=status.HTTP_204_NO_CONTENT
-        )
+        ), version)
 
 
 class UpdateCartItemQuantityView(APIView):
@@ -200,51 +524,102 @@ class UpdateCartItemQuantityView(APIView):
     
     @update_cart_item_quantity_decorator
     def patch(self, request, pk, item_id):
-        cart = get_object_or_404(Cart, pk=pk)
-        cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
-        
-        quantity = request.data.get('quantity')
-        
-        if not quantity or int(quantity) < 1:
+        serializer = CartItemQuantitySerializer(data=request.data)
+        if not serializer.is_valid():
             return Response(
                 {'error': 'La cantidad debe ser mayor a 0'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        quantity = serializer.validated_data['quantity']
         
-        # Verificar stock
-        if cart_item.product.stock < int(quantity):
-            return Response(
-                {'error': f'Stock insuficiente. Disponible: {cart_item.product.stock}'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        if is_ephemeral(pk):
+            with get_cart_store().lock(pk):
+                return self.patch_ephemeral(pk, item_id, quantity)
         
-        cart_item.quantity = int(quantity)
-        cart_item.save()
+        cart = get_object_or_404(Cart, pk=pk)
+        cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
         
-        return Response(
+        if_match = get_if_match(request)
+        try:
+            with transaction.atomic():
+                version = bump_cart_version(cart.pk, if_match)
+                if version is None:
+                    raise Http404
+                cart_item = get_object_or_404(CartItem.objects.select_for_update(), pk=cart_item.pk)
+                
+                # Reservar o liberar solo la diferencia con lo ya reservado
+                errors = adjust_stock(cart_item.product_id, cart_item.reserved_quantity, quantity)
+                if errors:
+                    transaction.set_rollback(True)
+                    return stock_error_response(errors)
+                
+                cart_item.quantity = quantity
+                cart_item.reserved_quantity = quantity
+                cart_item.version = version
+                cart_item.save()
+        except StockConflict as e:
+            return stock_conflict_response(e)
+        except CartVersionConflict as e:
+            return version_conflict_response(e)
+        
+        return with_version(Response(
             {
                 'message': 'Cantidad actualizada correctamente',
                 'item': CartItemSerializer(cart_item).data
             },
             status=status.HTTP_200_OK
-        )
+        ), version)
+    
+    def patch_ephemeral(self, session_id, item_id, quantity):
+        """Carrito sin guardar: se valida el stock pero todavía no se reserva"""
+        cart = get_ephemeral_cart_or_404(session_id)
+        cart_item = get_item(cart, item_id)
+        if cart_item is None:
+            raise Http404
         
+        errors = check_stock({cart_item['product_id']: quantity})
+        if errors:
+            return stock_error_response(errors)
+        cart_item['quantity'] = quantity
+        get_cart_store().save(cart)
+        return Response(
+            {
+                'message': 'Cantidad actualizada correctamente',
+                'item': ephemeral_item_data(cart, item_id)
+            },
+            status=status.HTTP_200_OK
+        )
+
 
 class CreateCartView(APIView):
     """
-    POST: Crear un carrito vacío
+    POST: Crear un carrito vacío (efímero hasta que se guarde)
     """
     
     @create_Cart
+    @idempotent
     def post(self, request):
-        # Crear carrito vacío
-        cart = Cart.objects.create(is_saved=False)
-        serializer = CartSerializer(cart)
+        serializer = CreateCartSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        # El carrito vive en el almacén de carritos efímeros, no en la base de datos
+        store = get_cart_store()
+        session_id = serializer.validated_data.get('session_id')
+        if session_id:
+            with store.lock(session_id):
+                cart = store.get(session_id)
+                created = cart is None
+                if created:
+                    cart = store.create(session_id)
+        else:
+            cart = store.create()
+            created = True
         
         return Response(
             {
-                'message': 'Carrito creado correctamente',
-                'cart': serializer.data
+                'message': 'Carrito creado correctamente' if created else 'El carrito ya existe',
+                'cart': EphemeralCartSerializer(ephemeral_cart_instance(cart)).data
             },
-            status=status.HTTP_201_CREATED
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
         )
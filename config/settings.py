@@ -26,6 +26,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'rest_framework_simplejwt',
@@ -95,6 +96,52 @@ SPECTACULAR_SETTINGS = {
     ]
 }
 
+# Paginación por cursor de los listados de productos
+PRODUCTS_PAGE_SIZE = int(os.environ.get('PRODUCTS_PAGE_SIZE', 20))
+PRODUCTS_MAX_PAGE_SIZE = int(os.environ.get('PRODUCTS_MAX_PAGE_SIZE', 100))
+
+# Caché (locmem por defecto; en producción usar un backend compartido, p. ej. Redis)
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'mini-ecommerce'),
+    }
+}
+
+# Carritos sin guardar: backend de almacenamiento, alias de caché y segundos de inactividad hasta expirar
+CART_STORE = os.environ.get('CART_STORE', 'cart.store.CacheCartStore')
+CART_STORE_CACHE_ALIAS = os.environ.get('CART_STORE_CACHE_ALIAS', 'default')
+CART_STORE_TIMEOUT = int(os.environ.get('CART_STORE_TIMEOUT', 60 * 60 * 24 * 7))
+
+# Candado por sesión de los carritos sin guardar: segundos hasta que expira y máximo de espera
+CART_STORE_LOCK_TIMEOUT = int(os.environ.get('CART_STORE_LOCK_TIMEOUT', 5))
+CART_STORE_LOCK_WAIT = float(os.environ.get('CART_STORE_LOCK_WAIT', 2))
+
+# Idempotency-Key: segundos que se conserva una respuesta y que puede quedar en curso una petición
+CART_IDEMPOTENCY_TTL = int(os.environ.get('CART_IDEMPOTENCY_TTL', 60 * 60 * 24))
+CART_IDEMPOTENCY_PENDING_TIMEOUT = int(os.environ.get('CART_IDEMPOTENCY_PENDING_TIMEOUT', 60))
+
+# Máximo de operaciones por petición a PATCH /api/cart/<pk>/items/
+CART_MAX_OPERATIONS = int(os.environ.get('CART_MAX_OPERATIONS', 100))
+
+# Segundos que se conserva una respuesta cacheada del catálogo
+PRODUCTS_CACHE_TIMEOUT = int(os.environ.get('PRODUCTS_CACHE_TIMEOUT', 300))
+
+# Caché LRU en memoria de cada worker para el detalle de producto
+PRODUCTS_DETAIL_CACHE_SIZE = int(os.environ.get('PRODUCTS_DETAIL_CACHE_SIZE', 1024))
+PRODUCTS_DETAIL_CACHE_TIMEOUT = int(os.environ.get('PRODUCTS_DETAIL_CACHE_TIMEOUT', 30))
+
+# Máximo de IDs por consulta a /api/products/batch/
+PRODUCTS_BATCH_MAX_IDS = int(os.environ.get('PRODUCTS_BATCH_MAX_IDS', 100))
+
+# Autocompletado: sugerencias por defecto / máximas y segundos entre reconstrucciones del índice
+PRODUCTS_SUGGEST_LIMIT = int(os.environ.get('PRODUCTS_SUGGEST_LIMIT', 8))
+PRODUCTS_SUGGEST_MAX_LIMIT = int(os.environ.get('PRODUCTS_SUGGEST_MAX_LIMIT', 20))
+PRODUCTS_SUGGEST_REBUILD_INTERVAL = int(os.environ.get('PRODUCTS_SUGGEST_REBUILD_INTERVAL', 300))
+
+# Filas leídas por viaje a la base de datos al exportar el catálogo
+PRODUCTS_EXPORT_CHUNK_SIZE = int(os.environ.get('PRODUCTS_EXPORT_CHUNK_SIZE', 2000))
+
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
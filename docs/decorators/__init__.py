@@ -5,11 +5,17 @@ from .swagger_decorators import (
     product_list_decorator,
     product_detail_decorator,
     product_active_decorator,
+    product_cache_stats_decorator,
+    product_export_decorator,
+    product_facets_decorator,
+    product_batch_decorator,
+    product_suggest_decorator,
     save_cart_decorator,
     cart_list_decorator,
     cart_detail_get_decorator,
     cart_detail_delete_decorator,
     add_cart_item_decorator,
+    cart_items_batch_decorator,
     remove_cart_item_decorator,
     update_cart_item_quantity_decorator,
 )
@@ -18,11 +24,17 @@ __all__ = [
     'product_list_decorator',
     'product_detail_decorator',
     'product_active_decorator',
+    'product_cache_stats_decorator',
+    'product_export_decorator',
+    'product_facets_decorator',
+    'product_batch_decorator',
+    'product_suggest_decorator',
     'save_cart_decorator',
     'cart_list_decorator',
     'cart_detail_get_decorator',
     'cart_detail_delete_decorator',
     'add_cart_item_decorator',
+    'cart_items_batch_decorator',
     'remove_cart_item_decorator',
     'update_cart_item_quantity_decorator',
 ]
\ No newline at end of file
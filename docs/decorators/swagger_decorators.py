@@ -6,6 +6,9 @@ from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExampl
 from drf_spectacular.types import OpenApiTypes
 from rest_framework import serializers
 
+from cart.serializers import CartItemSerializer, CartSerializer, CartSummarySerializer
+from products.serializers import ProductSerializer
+
 
 # ==================== SERIALIZERS INLINE PARA REQUESTS ====================
 
@@ -51,57 +54,300 @@ class SaveCartRequestSerializer(serializers.Serializer):
     )
 
 
+# ==================== PARÁMETROS COMUNES ====================
+
+CURSOR_PAGINATION_PARAMETERS = [
+    OpenApiParameter(
+        name='cursor',
+        description='Cursor opaco devuelto en "next" o "previous" de la página anterior',
+        required=False,
+        type=OpenApiTypes.STR,
+    ),
+    OpenApiParameter(
+        name='page_size',
+        description='Cantidad de resultados por página (por defecto 20, máximo 100)',
+        required=False,
+        type=OpenApiTypes.INT,
+    ),
+]
+
+
+# Los listados solo se validan por ETag: un borrado no mueve la fecha de
+# modificación del catálogo, así que no envían Last-Modified
+CONDITIONAL_GET_PARAMETERS = [
+    OpenApiParameter(
+        name='If-None-Match',
+        location=OpenApiParameter.HEADER,
+        description='ETag de una respuesta anterior; si no hubo cambios se responde 304',
+        required=False,
+        type=OpenApiTypes.STR,
+    ),
+]
+
+PRODUCT_CONDITIONAL_GET_PARAMETERS = [
+    *CONDITIONAL_GET_PARAMETERS,
+    OpenApiParameter(
+        name='If-Modified-Since',
+        location=OpenApiParameter.HEADER,
+        description='Fecha HTTP de Last-Modified de una respuesta anterior',
+        required=False,
+        type=OpenApiTypes.STR,
+    ),
+]
+
+
+def _readable_fields(serializer_class):
+    """Campos que admiten `fields` / `omit`: los mismos que resuelve SparseFieldsetMixin"""
+    return [name for name, field in serializer_class().fields.items() if not field.write_only]
+
+
+PRODUCT_FIELDS = _readable_fields(ProductSerializer)
+CART_FIELDS = _readable_fields(CartSerializer)
+CART_SUMMARY_ONLY_FIELDS = [name for name in _readable_fields(CartSummarySerializer) if name not in CART_FIELDS]
+CART_ITEM_FIELDS = _readable_fields(CartItemSerializer)
+
+PRODUCT_FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        name='fields',
+        description=(
+            'Campos a incluir, separados por coma (solo se leen esas columnas). '
+            f'Disponibles: {", ".join(PRODUCT_FIELDS)}'
+        ),
+        required=False,
+        type=OpenApiTypes.STR,
+        examples=[OpenApiExample('Grilla de listado', value='id,name,price,image_url')],
+    ),
+    OpenApiParameter(
+        name='omit',
+        description=f'Campos a excluir, separados por coma. Disponibles: {", ".join(PRODUCT_FIELDS)}',
+        required=False,
+        type=OpenApiTypes.STR,
+        examples=[OpenApiExample('Sin descripción', value='description')],
+    ),
+]
+
+CART_FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        name='fields',
+        description=(
+            'Campos a incluir, separados por coma; los anidados usan notación de puntos. '
+            f'Carrito: {", ".join(CART_FIELDS)} '
+            f'(en el resumen del listado: {", ".join(CART_SUMMARY_ONLY_FIELDS)} en lugar de items). '
+            f'Items: {", ".join("items." + field for field in CART_ITEM_FIELDS)}. '
+            f'Producto: {", ".join("items.product." + field for field in PRODUCT_FIELDS)}'
+        ),
+        required=False,
+        type=OpenApiTypes.STR,
+        examples=[OpenApiExample('Resumen con nombres', value='id,total,items.quantity,items.product.name')],
+    ),
+    OpenApiParameter(
+        name='omit',
+        description='Campos a excluir, con la misma notación y los mismos nombres que "fields"',
+        required=False,
+        type=OpenApiTypes.STR,
+        examples=[OpenApiExample('Sin descripciones', value='items.product.description')],
+    ),
+]
+
+
+PRODUCT_FILTER_PARAMETERS = [
+    OpenApiParameter(
+        name='min_price',
+        description='Precio mínimo (inclusive)',
+        required=False,
+        type=OpenApiTypes.DECIMAL,
+        examples=[OpenApiExample('Desde 100', value='100.00')],
+    ),
+    OpenApiParameter(
+        name='max_price',
+        description='Precio máximo (inclusive); no puede ser menor que "min_price"',
+        required=False,
+        type=OpenApiTypes.DECIMAL,
+        examples=[OpenApiExample('Hasta 500', value='500.00')],
+    ),
+    OpenApiParameter(
+        name='in_stock',
+        description='true: solo productos con stock; false: solo productos agotados',
+        required=False,
+        type=OpenApiTypes.BOOL,
+    ),
+]
+
+PRODUCT_FILTER_ERROR_RESPONSE = {
+    'description': 'Filtros inválidos',
+    'examples': {
+        'application/json': {
+            'value': {'non_field_errors': ["'min_price' no puede ser mayor que 'max_price'"]}
+        }
+    }
+}
+
+
+STOCK_CONFLICT_RESPONSE = {
+    'description': 'El stock cambió durante la operación; se puede reintentar',
+    'examples': {
+        'application/json': {
+            'value': {'error': 'El stock cambió durante la operación, intente nuevamente'}
+        }
+    }
+}
+
+IDEMPOTENCY_KEY_PARAMETER = OpenApiParameter(
+    name='Idempotency-Key',
+    location=OpenApiParameter.HEADER,
+    description=(
+        'Clave única por operación (p. ej. un UUID) para reintentar sin duplicar: los reintentos con la misma '
+        'clave y el mismo cuerpo reciben la respuesta original (cabecera "Idempotent-Replayed: true"). '
+        'Mientras la petición original está en curso se responde 409'
+    ),
+    required=False,
+    type=OpenApiTypes.STR,
+)
+
+IDEMPOTENCY_KEY_MISMATCH_RESPONSE = {
+    'description': 'La Idempotency-Key ya se usó con un cuerpo distinto',
+    'examples': {
+        'application/json': {
+            'value': {'error': 'La Idempotency-Key ya se usó con una petición distinta'}
+        }
+    }
+}
+
+IDEMPOTENCY_IN_PROGRESS_RESPONSE = {
+    'description': 'Una petición con la misma Idempotency-Key todavía está en curso',
+    'examples': {
+        'application/json': {
+            'value': {'error': 'Una petición con esta Idempotency-Key todavía está en curso'}
+        }
+    }
+}
+
+CART_IF_MATCH_PARAMETER = OpenApiParameter(
+    name='If-Match',
+    location=OpenApiParameter.HEADER,
+    description=(
+        'Versión del carrito sobre la que se hizo el cambio (el ETag de la última respuesta, p. ej. "3"). '
+        'Si otro cambio se adelantó se responde 409 con la versión actual. Solo carritos guardados'
+    ),
+    required=False,
+    type=OpenApiTypes.STR,
+)
+
+CART_VERSION_CONFLICT_RESPONSE = {
+    'description': (
+        'La versión del carrito no coincide con If-Match, o el carrito sin guardar '
+        'lo está modificando otra petición y se puede reintentar'
+    ),
+    'examples': {
+        'application/json': {
+            'value': {'error': 'El carrito cambió, la versión actual es 4', 'version': 4}
+        }
+    }
+}
+
+CART_CONFLICT_RESPONSE = {
+    'description': (
+        'La versión del carrito no coincide con If-Match (se informa la actual), '
+        'o el stock cambió o el carrito sin guardar lo está modificando otra '
+        'petición, y se puede reintentar'
+    ),
+    'examples': {
+        'application/json': {
+            'value': {'error': 'El carrito cambió, la versión actual es 4', 'version': 4}
+        }
+    }
+}
+
+
 # ==================== PRODUCTS DECORATORS ====================
 
 product_list_decorator = extend_schema(
     tags=['Products'],
     summary='Listar productos',
-    description='Obtiene una lista de todos los productos activos. Permite filtrado por búsqueda y ordenamiento.',
+    description=(
+        'Obtiene una lista paginada por cursor de los productos activos. '
+        'Permite filtrado por búsqueda, rango de precio y disponibilidad, y ordenamiento; '
+        'el cursor queda atado al ordenamiento solicitado.'
+    ),
     parameters=[
+        *CONDITIONAL_GET_PARAMETERS,
         OpenApiParameter(
             name='search',
-            description='Buscar productos por nombre',
+            description=(
+                'Búsqueda de texto completo en nombre y descripción (el nombre pesa más). '
+                'Cada palabra se busca como prefijo y en PostgreSQL se toleran errores de tipeo en el nombre.'
+            ),
             required=False,
             type=OpenApiTypes.STR,
             examples=[
                 OpenApiExample(
                     'Búsqueda simple',
                     value='laptop',
-                    description='Busca productos que contengan "laptop" en el nombre'
+                    description='Busca productos que contengan "laptop" en el nombre o la descripción'
                 ),
             ],
         ),
         OpenApiParameter(
             name='ordering',
-            description='Campo por el cual ordenar los resultados',
+            description=(
+                'Campo por el cual ordenar los resultados; cualquier otro valor responde 400. '
+                'Los empates se resuelven por ID. "relevance" solo aplica junto con "search".'
+            ),
             required=False,
             type=OpenApiTypes.STR,
-            enum=['-created_at', 'created_at', 'name', '-name', 'price', '-price'],
+            enum=['-created_at', 'created_at', 'name', '-name', 'price', '-price', 'relevance'],
             default='-created_at',
             examples=[
                 OpenApiExample('Más recientes primero', value='-created_at'),
+                OpenApiExample('Más relevantes primero', value='relevance'),
                 OpenApiExample('Precio ascendente', value='price'),
                 OpenApiExample('Precio descendente', value='-price'),
             ],
         ),
+        *PRODUCT_FILTER_PARAMETERS,
+        *CURSOR_PAGINATION_PARAMETERS,
+        *PRODUCT_FIELDSET_PARAMETERS,
     ],
     responses={
         200: {
             'description': 'Lista de productos obtenida exitosamente',
             'examples': {
                 'application/json': {
-                    'value': [
-                        {
-                            "id": 1,
-                            "name": "Laptop HP Pavilion",
-                            "description": "Laptop potente para trabajo",
-                            "price": "899.99",
-                            "stock": 15,
-                            "image_url": "https://example.com/laptop.jpg",
-                            "is_active": True,
-                            "created_at": "2024-01-15T10:30:00Z"
-                        }
-                    ]
+                    'value': {
+                        'next': 'http://localhost:8000/api/products/?cursor=eyJvIjoiLWNyZWF0ZWRfYXQiLCJ2IjoiMjAyNC0wMS0xNVQxMDozMDowMCswMDowMCIsImlkIjoxLCJyIjowfQ%3D%3D',
+                        'previous': None,
+                        'results': [
+                            {
+                                "id": 1,
+                                "name": "Laptop HP Pavilion",
+                                "description": "Laptop potente para trabajo",
+                                "price": "899.99",
+                                "stock": 15,
+                                "image_url": "https://example.com/laptop.jpg",
+                                "is_active": True,
+                                "created_at": "2024-01-15T10:30:00Z"
+                            }
+                        ]
+                    }
+                }
+            }
+        },
+        400: {
+            'description': 'Filtros u ordenamiento inválidos',
+            'examples': {
+                'application/json': {
+                    'value': {'ordering': ["Ordenamiento no soportado: 'description'. Opciones: -created_at, created_at, name, -name, price, -price, relevance"]}
+                }
+            }
+        },
+        304: {
+            'description': 'Sin cambios desde el ETag (If-None-Match) enviado',
+        },
+        404: {
+            'description': 'Cursor inválido',
+            'examples': {
+                'application/json': {
+                    'value': {'detail': 'Cursor inválido'}
                 }
             }
         },
@@ -112,7 +358,11 @@ product_list_decorator = extend_schema(
 product_detail_decorator = extend_schema(
     tags=['Products'],
     summary='Obtener detalles de un producto',
-    description='Obtiene la información completa de un producto específico por su ID.',
+    description=(
+        'Obtiene la información completa de un producto específico por su ID. '
+        'Los productos más consultados se sirven desde una caché en memoria de cada worker.'
+    ),
+    parameters=[*PRODUCT_CONDITIONAL_GET_PARAMETERS, *PRODUCT_FIELDSET_PARAMETERS],
     responses={
         200: {
             'description': 'Producto encontrado exitosamente',
@@ -131,6 +381,9 @@ product_detail_decorator = extend_schema(
                 }
             }
         },
+        304: {
+            'description': 'Sin cambios desde el ETag (If-None-Match) o la fecha (If-Modified-Since) enviados',
+        },
         404: {
             'description': 'Producto no encontrado',
             'examples': {
@@ -146,24 +399,280 @@ product_detail_decorator = extend_schema(
 product_active_decorator = extend_schema(
     tags=['Products'],
     summary='Listar productos disponibles',
-    description='Obtiene todos los productos activos que tienen stock disponible (stock > 0).',
+    description='Obtiene, paginados por cursor, los productos activos que tienen stock disponible (stock > 0).',
+    parameters=[*CONDITIONAL_GET_PARAMETERS, *CURSOR_PAGINATION_PARAMETERS, *PRODUCT_FIELDSET_PARAMETERS],
     responses={
         200: {
             'description': 'Productos disponibles obtenidos exitosamente',
             'examples': {
                 'application/json': {
-                    'value': [
-                        {
-                            "id": 1,
-                            "name": "Laptop HP Pavilion",
-                            "description": "Laptop potente",
-                            "price": "899.99",
-                            "stock": 15,
-                            "image_url": "https://example.com/laptop.jpg",
-                            "is_active": True,
-                            "created_at": "2024-01-15T10:30:00Z"
+                    'value': {
+                        'next': None,
+                        'previous': None,
+                        'results': [
+                            {
+                                "id": 1,
+                                "name": "Laptop HP Pavilion",
+                                "description": "Laptop potente",
+                                "price": "899.99",
+                                "stock": 15,
+                                "image_url": "https://example.com/laptop.jpg",
+                                "is_active": True,
+                                "created_at": "2024-01-15T10:30:00Z"
+                            }
+                        ]
+                    }
+                }
+            }
+        },
+        304: {
+            'description': 'Sin cambios desde el ETag (If-None-Match) enviado',
+        },
+        404: {
+            'description': 'Cursor inválido',
+            'examples': {
+                'application/json': {
+                    'value': {'detail': 'Cursor inválido'}
+                }
+            }
+        },
+    },
+)
+
+
+product_suggest_decorator = extend_schema(
+    tags=['Products'],
+    summary='Autocompletar productos',
+    description=(
+        'Sugerencias para el buscador mientras se escribe. Busca el texto como prefijo de cualquier '
+        'palabra del nombre (sin distinguir mayúsculas ni tildes) en un índice en memoria y devuelve '
+        'solo ID y nombre, ordenados por popularidad (veces que el producto se agregó a un carrito).'
+    ),
+    parameters=[
+        OpenApiParameter(
+            name='q',
+            description='Texto escrito hasta el momento',
+            required=True,
+            type=OpenApiTypes.STR,
+            examples=[OpenApiExample('Prefijo', value='lap')],
+        ),
+        OpenApiParameter(
+            name='limit',
+            description='Cantidad de sugerencias (por defecto 8, máximo 20)',
+            required=False,
+            type=OpenApiTypes.INT,
+        ),
+    ],
+    responses={
+        200: {
+            'description': 'Sugerencias obtenidas exitosamente',
+            'examples': {
+                'application/json': {
+                    'value': {
+                        'results': [
+                            {'id': 1, 'name': 'Laptop HP Pavilion'},
+                            {'id': 7, 'name': 'Laptop Lenovo IdeaPad'}
+                        ]
+                    }
+                }
+            }
+        },
+        400: {
+            'description': 'Parámetro limit inválido',
+            'examples': {
+                'application/json': {
+                    'value': {'error': 'El parámetro limit debe ser un número entero'}
+                }
+            }
+        },
+    },
+)
+
+
+product_batch_decorator = extend_schema(
+    tags=['Products'],
+    summary='Obtener varios productos por ID',
+    description=(
+        'Resuelve una lista de IDs con una sola consulta y devuelve los productos activos en el mismo '
+        'orden en que se pidieron. Los IDs inexistentes o inactivos se informan en "missing". '
+        'Pensado para widgets como el carrito lateral o "vistos recientemente".'
+    ),
+    parameters=[
+        *CONDITIONAL_GET_PARAMETERS,
+        OpenApiParameter(
+            name='ids',
+            description='IDs separados por coma (máximo 100 por defecto); los duplicados se ignoran',
+            required=True,
+            type=OpenApiTypes.STR,
+            examples=[OpenApiExample('Tres productos', value='3,1,2')],
+        ),
+        *PRODUCT_FIELDSET_PARAMETERS,
+    ],
+    responses={
+        200: {
+            'description': 'Productos obtenidos exitosamente',
+            'examples': {
+                'application/json': {
+                    'value': {
+                        'results': [
+                            {
+                                "id": 3,
+                                "name": "Mouse Logitech",
+                                "description": "Mouse inalámbrico",
+                                "price": "29.99",
+                                "stock": 40,
+                                "image_url": "https://example.com/mouse.jpg",
+                                "is_active": True,
+                                "created_at": "2024-01-16T09:00:00Z"
+                            },
+                            {
+                                "id": 1,
+                                "name": "Laptop HP Pavilion",
+                                "description": "Laptop potente",
+                                "price": "899.99",
+                                "stock": 15,
+                                "image_url": "https://example.com/laptop.jpg",
+                                "is_active": True,
+                                "created_at": "2024-01-15T10:30:00Z"
+                            }
+                        ],
+                        'missing': [2]
+                    }
+                }
+            }
+        },
+        304: {
+            'description': 'Sin cambios desde el ETag (If-None-Match) enviado',
+        },
+        400: {
+            'description': 'Lista de IDs vacía, inválida o demasiado larga',
+            'examples': {
+                'application/json': {
+                    'value': {'ids': ['Máximo 100 IDs por consulta']}
+                }
+            }
+        },
+    },
+)
+
+
+product_facets_decorator = extend_schema(
+    tags=['Products'],
+    summary='Facetas de productos',
+    description=(
+        'Histograma de precios en intervalos de ancho fijo y conteos de productos con y sin stock, '
+        'calculados en una sola consulta sobre los productos activos que cumplen los filtros. '
+        'Acepta los mismos filtros que el listado para construir la barra lateral de filtros.'
+    ),
+    parameters=[
+        *CONDITIONAL_GET_PARAMETERS,
+        OpenApiParameter(
+            name='search',
+            description='Búsqueda de texto completo, igual que en el listado',
+            required=False,
+            type=OpenApiTypes.STR,
+        ),
+        *PRODUCT_FILTER_PARAMETERS,
+        OpenApiParameter(
+            name='interval',
+            description='Ancho de cada intervalo del histograma de precios (mínimo 1)',
+            required=False,
+            type=OpenApiTypes.DECIMAL,
+            default=50,
+        ),
+    ],
+    responses={
+        200: {
+            'description': 'Facetas calculadas exitosamente',
+            'examples': {
+                'application/json': {
+                    'value': {
+                        'count': 42,
+                        'in_stock': 37,
+                        'out_of_stock': 5,
+                        'price': {'min': '12.50', 'max': '149.90'},
+                        'histogram': [
+                            {'min': '0.00', 'max': '50.00', 'count': 18, 'in_stock': 16},
+                            {'min': '50.00', 'max': '100.00', 'count': 15, 'in_stock': 13},
+                            {'min': '100.00', 'max': '150.00', 'count': 9, 'in_stock': 8}
+                        ]
+                    }
+                }
+            }
+        },
+        304: {
+            'description': 'Sin cambios desde el ETag (If-None-Match) enviado',
+        },
+        400: PRODUCT_FILTER_ERROR_RESPONSE,
+    },
+)
+
+
+product_cache_stats_decorator = extend_schema(
+    tags=['Products'],
+    summary='Estadísticas de la caché del catálogo',
+    description=(
+        'Devuelve la versión actual del catálogo y los contadores de aciertos y fallos de la caché '
+        'de respuestas de productos, más los de la caché LRU del detalle del worker que responde. '
+        'Requiere un usuario administrador.'
+    ),
+    responses={
+        200: {
+            'description': 'Estadísticas obtenidas exitosamente',
+            'examples': {
+                'application/json': {
+                    'value': {
+                        'version': 1760781234000000012,
+                        'hits': 9120,
+                        'misses': 412,
+                        'hit_ratio': 0.9568,
+                        'detail_lru': {
+                            'size': 212,
+                            'maxsize': 1024,
+                            'hits': 48210,
+                            'misses': 230,
+                            'coalesced': 17
                         }
-                    ]
+                    }
+                }
+            }
+        },
+    },
+)
+
+
+product_export_decorator = extend_schema(
+    tags=['Products'],
+    summary='Exportar catálogo',
+    description=(
+        'Transmite en streaming todos los productos activos, ordenados por ID, con memoria constante '
+        'sin importar el tamaño del catálogo. Si el cliente envía "Accept-Encoding: gzip" la respuesta '
+        'se comprime al vuelo.'
+    ),
+    parameters=[
+        OpenApiParameter(
+            name='output',
+            description='Formato de salida: NDJSON (un producto por línea) o un arreglo JSON',
+            required=False,
+            type=OpenApiTypes.STR,
+            enum=['ndjson', 'json'],
+            default='ndjson',
+        ),
+    ],
+    responses={
+        200: {
+            'description': 'Catálogo exportado (application/x-ndjson o application/json)',
+            'examples': {
+                'application/x-ndjson': {
+                    'value': '{"id":1,"name":"Laptop HP Pavilion","description":"Laptop potente","price":"899.99","stock":15,"image_url":"https://example.com/laptop.jpg","is_active":true,"created_at":"2024-01-15T10:30:00Z"}\n'
+                }
+            }
+        },
+        400: {
+            'description': 'Formato no soportado',
+            'examples': {
+                'application/json': {
+                    'value': {'error': 'Formato no soportado. Opciones: ndjson, json'}
                 }
             }
         },
@@ -176,8 +685,27 @@ product_active_decorator = extend_schema(
 create_Cart = extend_schema(
     tags=['Cart'],
     summary='Crear carrito vacío',
-    description='Crea un nuevo carrito vacío para comenzar a agregar productos.',
-    request=None,
+    description=(
+        'Crea un carrito efímero vacío: vive en la caché (no en la base de datos) hasta que se guarda '
+        'con POST /api/cart/save/ usando su session_id, y expira si se abandona. Su identificador en las '
+        'URLs del carrito es el session_id. Si se envía un session_id que ya tiene carrito, se devuelve ese '
+        'carrito con 200.'
+    ),
+    parameters=[IDEMPOTENCY_KEY_PARAMETER],
+    request={
+        'application/json': {
+            'type': 'object',
+            'properties': {
+                'session_id': {
+                    'type': 'string',
+                    'description': 'Identificador de la sesión (letras, números, "-" y "_"; no solo dígitos '
+                                   'ni "save" o "create"). '
+                                   'Si se omite se genera uno',
+                    'example': 'sess_a1b2c3'
+                }
+            },
+        }
+    },
     responses={
         201: {
             'description': 'Carrito creado exitosamente',
@@ -186,18 +714,35 @@ create_Cart = extend_schema(
                     'value': {
                         'message': 'Carrito creado correctamente',
                         'cart': {
-                            'id': 1,
-                            'session_id': None,
+                            'id': 'sess_a1b2c3',
+                            'session_id': 'sess_a1b2c3',
                             'items': [],
                             'total': '0.00',
                             'total_items': 0,
                             'is_saved': False,
-                            'created_at': '2025-01-09T20:30:00Z'
+                            'created_at': '2025-01-09T20:30:00Z',
+                            'updated_at': '2025-01-09T20:30:00Z'
                         }
                     }
                 }
             }
         },
+        200: {
+            'description': 'La sesión ya tenía un carrito; se devuelve el existente'
+        },
+        400: {
+            'description': 'session_id inválido',
+            'examples': {
+                'application/json': {
+                    'value': {'session_id': [
+                        "Solo letras, números, '-' y '_' (máximo 64), no puede ser solo numérico "
+                        "ni coincidir con una ruta del carrito ('save', 'create')"
+                    ]}
+                }
+            }
+        },
+        409: IDEMPOTENCY_IN_PROGRESS_RESPONSE,
+        422: IDEMPOTENCY_KEY_MISMATCH_RESPONSE,
     },
 )
 
@@ -205,7 +750,14 @@ create_Cart = extend_schema(
 save_cart_decorator = extend_schema(
     tags=['Cart'],
     summary='Guardar carrito completo',
-    description='Crea un nuevo carrito guardado con los items especificados. Valida stock y disponibilidad de productos.',
+    description=(
+        'Crea un nuevo carrito guardado con los items especificados y reserva su stock de forma atómica. '
+        'Valida stock y disponibilidad de todos los productos a la vez e informa en "errors" cada item que '
+        'no puede guardarse. Las líneas repetidas de un mismo producto se suman. '
+        'En lugar de "items" puede enviarse el "session_id" de un carrito efímero: sus items se guardan '
+        'y el carrito efímero se elimina.'
+    ),
+    parameters=[IDEMPOTENCY_KEY_PARAMETER],
     request={
         'application/json': {
             'type': 'object',
@@ -230,9 +782,13 @@ save_cart_decorator = extend_schema(
                         'required': ['product_id', 'quantity']
                     },
                     'description': 'Lista de items del carrito'
+                },
+                'session_id': {
+                    'type': 'string',
+                    'description': 'Carrito efímero a guardar (alternativa a "items")',
+                    'example': 'sess_a1b2c3'
                 }
             },
-            'required': ['items'],
             'example': {
                 'items': [
                     {'product_id': 1, 'quantity': 2},
@@ -276,18 +832,43 @@ save_cart_decorator = extend_schema(
             'description': 'Error de validación o stock insuficiente',
             'examples': {
                 'application/json': {
-                    'value': {'error': 'Stock insuficiente para Laptop HP. Disponible: 5'}
+                    'value': {
+                        'error': 'Stock insuficiente para Laptop HP. Disponible: 5',
+                        'errors': [
+                            {
+                                'product_id': 1,
+                                'code': 'insufficient_stock',
+                                'error': 'Stock insuficiente para Laptop HP. Disponible: 5'
+                            }
+                        ]
+                    }
                 }
             }
         },
         404: {
-            'description': 'Producto no encontrado',
+            'description': 'Algún producto no existe o está inactivo (se informan también los demás errores)',
             'examples': {
                 'application/json': {
-                    'value': {'error': 'Producto con ID 999 no encontrado'}
+                    'value': {
+                        'error': '2 items no pudieron guardarse',
+                        'errors': [
+                            {
+                                'product_id': 1,
+                                'code': 'insufficient_stock',
+                                'error': 'Stock insuficiente para Laptop HP. Disponible: 5'
+                            },
+                            {
+                                'product_id': 999,
+                                'code': 'not_found',
+                                'error': 'Producto con ID 999 no encontrado'
+                            }
+                        ]
+                    }
                 }
             }
         },
+        409: STOCK_CONFLICT_RESPONSE,
+        422: IDEMPOTENCY_KEY_MISMATCH_RESPONSE,
     },
 )
 
@@ -295,24 +876,77 @@ save_cart_decorator = extend_schema(
 cart_list_decorator = extend_schema(
     tags=['Cart'],
     summary='Listar carritos guardados',
-    description='Obtiene todos los carritos que han sido guardados, ordenados por fecha de creación descendente.',
+    description=(
+        'Obtiene, paginados por cursor y ordenados por fecha de creación descendente, los carritos guardados. '
+        'Por defecto devuelve un resumen (totales y cantidad de líneas) sin los items; '
+        'con "include=items" devuelve cada carrito completo.'
+    ),
+    parameters=[
+        OpenApiParameter(
+            name='include',
+            description='"items" para incluir los items completos de cada carrito',
+            required=False,
+            type=OpenApiTypes.STR,
+            enum=['items'],
+        ),
+        OpenApiParameter(
+            name='session_id',
+            description='Solo los carritos de esta sesión',
+            required=False,
+            type=OpenApiTypes.STR,
+        ),
+        OpenApiParameter(
+            name='created_after',
+            description='Creados desde esta fecha/hora, inclusive (ISO 8601 o YYYY-MM-DD)',
+            required=False,
+            type=OpenApiTypes.DATETIME,
+        ),
+        OpenApiParameter(
+            name='created_before',
+            description='Creados hasta esta fecha/hora, inclusive (ISO 8601 o YYYY-MM-DD)',
+            required=False,
+            type=OpenApiTypes.DATETIME,
+        ),
+        *CURSOR_PAGINATION_PARAMETERS,
+        *CART_FIELDSET_PARAMETERS,
+    ],
     responses={
         200: {
             'description': 'Lista de carritos obtenida exitosamente',
             'examples': {
                 'application/json': {
-                    'value': [
-                        {
-                            'id': 1,
-                            'session_id': None,
-                            'items': [],
-                            'total': '1799.98',
-                            'total_items': 2,
-                            'is_saved': True,
-                            'created_at': '2024-01-20T14:30:00Z',
-                            'updated_at': '2024-01-20T14:30:00Z'
-                        }
-                    ]
+                    'value': {
+                        'next': 'http://localhost:8000/api/cart/?cursor=eyJvIjoiLWNyZWF0ZWRfYXQiLCJ2IjoiMjAyNC0wMS0yMFQxNDozMDowMCswMDowMCIsImlkIjoxLCJyIjowfQ%3D%3D',
+                        'previous': None,
+                        'results': [
+                            {
+                                'id': 1,
+                                'session_id': None,
+                                'total': '1799.98',
+                                'total_items': 2,
+                                'item_count': 1,
+                                'is_saved': True,
+                                'created_at': '2024-01-20T14:30:00Z',
+                                'updated_at': '2024-01-20T14:30:00Z'
+                            }
+                        ]
+                    }
+                }
+            }
+        },
+        400: {
+            'description': 'Filtros o campos inválidos',
+            'examples': {
+                'application/json': {
+                    'value': {'non_field_errors': ["'created_after' no puede ser posterior a 'created_before'"]}
+                }
+            }
+        },
+        404: {
+            'description': 'Cursor inválido',
+            'examples': {
+                'application/json': {
+                    'value': {'detail': 'Cursor inválido'}
                 }
             }
         },
@@ -323,7 +957,47 @@ cart_list_decorator = extend_schema(
 cart_detail_get_decorator = extend_schema(
     tags=['Cart'],
     summary='Obtener detalles de un carrito',
-    description='Obtiene la información completa de un carrito específico incluyendo todos sus items.',
+    description=(
+        'Obtiene la información completa de un carrito específico incluyendo todos sus items. '
+        'El identificador puede ser el ID de un carrito guardado o el session_id de uno efímero. '
+        'La versión del carrito guardado se devuelve también como ETag. Con "since_version" devuelve solo '
+        'los items creados o modificados después de esa versión y en "removed" los IDs de los eliminados, '
+        'junto con los totales actuales.'
+    ),
+    parameters=[
+        OpenApiParameter(
+            name='since_version',
+            description='Versión ya conocida por el cliente: devuelve solo los cambios posteriores (carritos guardados)',
+            required=False,
+            type=OpenApiTypes.INT,
+        ),
+        *CART_FIELDSET_PARAMETERS,
+    ],
+    examples=[
+        OpenApiExample(
+            'Lectura incremental (since_version=3)',
+            value={
+                'id': 1,
+                'version': 5,
+                'since_version': 3,
+                'items': [
+                    {
+                        'id': 4,
+                        'product': {'id': 7, 'name': 'Mouse', 'price': '19.99'},
+                        'quantity': 1,
+                        'subtotal': '19.99',
+                        'version': 5,
+                        'created_at': '2024-01-20T15:00:00Z'
+                    }
+                ],
+                'removed': [2],
+                'total': '1819.97',
+                'total_items': 3,
+                'updated_at': '2024-01-20T15:00:00Z'
+            },
+            response_only=True,
+        ),
+    ],
     responses={
         200: {
             'description': 'Carrito encontrado exitosamente',
@@ -343,18 +1017,28 @@ cart_detail_get_decorator = extend_schema(
                                 },
                                 'quantity': 2,
                                 'subtotal': '1799.98',
+                                'version': 1,
                                 'created_at': '2024-01-20T14:30:00Z'
                             }
                         ],
                         'total': '1799.98',
                         'total_items': 2,
                         'is_saved': True,
+                        'version': 1,
                         'created_at': '2024-01-20T14:30:00Z',
                         'updated_at': '2024-01-20T14:30:00Z'
                     }
                 }
             }
         },
+        400: {
+            'description': 'since_version inválido o usado con un carrito efímero',
+            'examples': {
+                'application/json': {
+                    'value': {'since_version': ['Solo disponible para carritos guardados']}
+                }
+            }
+        },
         404: {
             'description': 'Carrito no encontrado',
             'examples': {
@@ -370,7 +1054,11 @@ cart_detail_get_decorator = extend_schema(
 cart_detail_delete_decorator = extend_schema(
     tags=['Cart'],
     summary='Eliminar carrito',
-    description='Elimina permanentemente un carrito y todos sus items asociados.',
+    description=(
+        'Elimina permanentemente un carrito y todos sus items asociados, devolviendo al stock lo reservado. '
+        'Acepta el ID de un carrito guardado o el session_id de uno efímero.'
+    ),
+    parameters=[CART_IF_MATCH_PARAMETER],
     responses={
         204: {
             'description': 'Carrito eliminado exitosamente'
@@ -383,6 +1071,7 @@ cart_detail_delete_decorator = extend_schema(
                 }
             }
         },
+        409: CART_VERSION_CONFLICT_RESPONSE,
     },
 )
 
@@ -390,7 +1079,13 @@ cart_detail_delete_decorator = extend_schema(
 add_cart_item_decorator = extend_schema(
     tags=['Cart'],
     summary='Agregar item al carrito',
-    description='Agrega un producto al carrito existente. Si el producto ya existe en el carrito, incrementa la cantidad.',
+    description=(
+        'Agrega un producto al carrito existente y reserva su stock de forma atómica. '
+        'Si el producto ya existe en el carrito, incrementa la cantidad (los agregados simultáneos del mismo '
+        'producto se suman sin conflictos). En un carrito efímero '
+        '(identificado por su session_id) el stock solo se valida: se reserva al guardarlo.'
+    ),
+    parameters=[IDEMPOTENCY_KEY_PARAMETER, CART_IF_MATCH_PARAMETER],
     request={
         'application/json': {
             'type': 'object',
@@ -461,7 +1156,16 @@ add_cart_item_decorator = extend_schema(
             'description': 'Stock insuficiente o validación fallida',
             'examples': {
                 'application/json': {
-                    'value': {'error': 'Stock insuficiente. Disponible: 3'}
+                    'value': {
+                        'error': 'Stock insuficiente para Laptop HP. Disponible: 3',
+                        'errors': [
+                            {
+                                'product_id': 1,
+                                'code': 'insufficient_stock',
+                                'error': 'Stock insuficiente para Laptop HP. Disponible: 3'
+                            }
+                        ]
+                    }
                 }
             }
         },
@@ -469,10 +1173,122 @@ add_cart_item_decorator = extend_schema(
             'description': 'Producto o carrito no encontrado',
             'examples': {
                 'application/json': {
-                    'value': {'error': 'Producto no encontrado'}
+                    'value': {
+                        'error': 'Producto con ID 999 no encontrado',
+                        'errors': [
+                            {
+                                'product_id': 999,
+                                'code': 'not_found',
+                                'error': 'Producto con ID 999 no encontrado'
+                            }
+                        ]
+                    }
+                }
+            }
+        },
+        409: CART_CONFLICT_RESPONSE,
+        422: IDEMPOTENCY_KEY_MISMATCH_RESPONSE,
+    },
+)
+
+
+cart_items_batch_decorator = extend_schema(
+    tags=['Cart'],
+    summary='Modificar varios items del carrito',
+    description=(
+        'Aplica en orden una lista de operaciones sobre los items en una sola transacción y devuelve el '
+        'carrito resultante. "add" suma unidades de un producto (lo agrega si no estaba), "set" fija la '
+        'cantidad de un item y "remove" lo elimina. El stock se reserva o libera solo por la diferencia neta '
+        'de cada producto; si alguna operación falla no se aplica ninguna. En un carrito efímero el stock '
+        'solo se valida.'
+    ),
+    parameters=[CART_IF_MATCH_PARAMETER, *CART_FIELDSET_PARAMETERS],
+    request={
+        'application/json': {
+            'type': 'object',
+            'properties': {
+                'operations': {
+                    'type': 'array',
+                    'items': {
+                        'type': 'object',
+                        'properties': {
+                            'op': {'type': 'string', 'enum': ['add', 'set', 'remove']},
+                            'product_id': {'type': 'integer', 'description': 'Requerido en "add"'},
+                            'item_id': {'type': 'integer', 'description': 'Requerido en "set" y "remove"'},
+                            'quantity': {
+                                'type': 'integer',
+                                'minimum': 1,
+                                'description': 'Requerido en "add" y "set"'
+                            }
+                        },
+                        'required': ['op']
+                    },
+                    'description': 'Operaciones a aplicar, en orden'
+                }
+            },
+            'required': ['operations'],
+            'example': {
+                'operations': [
+                    {'op': 'add', 'product_id': 3, 'quantity': 1},
+                    {'op': 'set', 'item_id': 1, 'quantity': 4},
+                    {'op': 'remove', 'item_id': 2}
+                ]
+            }
+        }
+    },
+    responses={
+        200: {
+            'description': 'Operaciones aplicadas; se devuelve el carrito completo',
+            'examples': {
+                'application/json': {
+                    'value': {
+                        'message': 'Carrito actualizado correctamente',
+                        'cart': {
+                            'id': 1,
+                            'session_id': None,
+                            'items': [
+                                {
+                                    'id': 1,
+                                    'product': {'id': 1, 'name': 'Laptop HP', 'price': '899.99'},
+                                    'quantity': 4,
+                                    'subtotal': '3599.96'
+                                }
+                            ],
+                            'total': '3599.96',
+                            'total_items': 4,
+                            'is_saved': True,
+                            'created_at': '2024-01-20T14:30:00Z'
+                        }
+                    }
+                }
+            }
+        },
+        400: {
+            'description': 'Operaciones inválidas o stock insuficiente',
+            'examples': {
+                'application/json': {
+                    'value': {'operations': [{'quantity': ["Requerido para la operación 'set'"]}]}
+                }
+            }
+        },
+        404: {
+            'description': 'Carrito, item o producto no encontrado',
+            'examples': {
+                'application/json': {
+                    'value': {
+                        'error': 'Item con ID 7 no encontrado',
+                        'errors': [
+                            {
+                                'item_id': 7,
+                                'code': 'not_found',
+                                'error': 'Item con ID 7 no encontrado'
+                            }
+                        ]
+                    }
                 }
             }
         },
+        409: CART_CONFLICT_RESPONSE,
     },
 )
 
@@ -480,10 +1296,14 @@ add_cart_item_decorator = extend_schema(
 remove_cart_item_decorator = extend_schema(
     tags=['Cart'],
     summary='Eliminar item del carrito',
-    description='Elimina un producto específico del carrito.',
+    description=(
+        'Elimina un producto específico del carrito y devuelve al stock lo reservado. '
+        'Acepta el ID de un carrito guardado o el session_id de uno efímero.'
+    ),
+    parameters=[CART_IF_MATCH_PARAMETER],
     responses={
         204: {
-            'description': 'Item eliminado exitosamente'
+            'description': 'Item eliminado exitosamente; el ETag es la nueva versión del carrito'
         },
         404: {
             'description': 'Item o carrito no encontrado',
@@ -493,6 +1313,7 @@ remove_cart_item_decorator = extend_schema(
                 }
             }
         },
+        409: CART_VERSION_CONFLICT_RESPONSE,
     },
 )
 
@@ -500,7 +1321,12 @@ remove_cart_item_decorator = extend_schema(
 update_cart_item_quantity_decorator = extend_schema(
     tags=['Cart'],
     summary='Actualizar cantidad de item',
-    description='Actualiza la cantidad de un producto en el carrito. Valida que haya stock disponible.',
+    description=(
+        'Actualiza la cantidad de un producto en el carrito, reservando o liberando solo la diferencia '
+        'con lo ya reservado. Valida que haya stock disponible. En un carrito efímero '
+        '(identificado por su session_id) el stock solo se valida: se reserva al guardarlo.'
+    ),
+    parameters=[CART_IF_MATCH_PARAMETER],
     request={
         'application/json': {
             'type': 'object',
@@ -555,5 +1381,6 @@ update_cart_item_quantity_decorator = extend_schema(
                 }
             }
         },
+        409: CART_CONFLICT_RESPONSE,
     },
 )
\ No newline at end of file
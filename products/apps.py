@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class EcommerceConfig(AppConfig):
     name = 'products'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
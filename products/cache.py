@@ -0,0 +1,314 @@
+"""
+Caché de respuestas del catálogo de productos: caché versionada del lado
+del servidor, caché LRU por worker del detalle y peticiones condicionales
+(ETag / Last-Modified)
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+
+from .models import Product
+from .serializers import compiled_product_serializer
+
+CATALOG_VERSION_KEY = 'products:catalog:version'
+CACHE_HITS_KEY = 'products:catalog:hits'
+CACHE_MISSES_KEY = 'products:catalog:misses'
+
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key)
+
+
+def get_catalog_version():
+    """
+    Devuelve la versión actual del catálogo. Si la clave fue desalojada se
+    inicializa con un valor nuevo para no reutilizar entradas antiguas.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Invalida todas las respuestas cacheadas del catálogo"""
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def bump_catalog_version_on_commit():
+    """
+    Invalida al confirmar la transacción, para que ninguna lectura concurrente
+    guarde datos anteriores bajo la versión nueva.
+    """
+    transaction.on_commit(bump_catalog_version)
+
+
+def get_cache_stats():
+    hits = cache.get(CACHE_HITS_KEY, 0)
+    misses = cache.get(CACHE_MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'version': get_catalog_version(),
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else 0.0,
+        'detail_lru': product_detail_cache.stats(),
+    }
+
+
+class _Flight:
+    """Carga en curso de una clave; el resto de hilos espera su resultado"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+        self.invalidated = False
+
+
+class LocalLRUCache:
+    """
+    Caché LRU acotada en la memoria del proceso, con expiración por TTL.
+    Los fallos concurrentes de una misma clave se agrupan: solo un hilo
+    ejecuta la carga y los demás reciben su resultado (single-flight).
+    Los valores None no se guardan.
+    """
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_or_load(self, key, loader):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+        except Exception as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                # Una invalidación durante la carga indica que el valor puede ser obsoleto
+                if flight.error is None and flight.value is not None and not flight.invalidated:
+                    self._data[key] = (time.monotonic() + self.timeout, flight.value)
+                    self._data.move_to_end(key)
+                    while len(self._data) > self.maxsize:
+                        self._data.popitem(last=False)
+            flight.event.set()
+        return flight.value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            flight = self._inflight.get(key)
+            if flight is not None:
+                flight.invalidated = True
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            for flight in self._inflight.values():
+                flight.invalidated = True
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+            }
+
+
+# Cada worker tiene su propia copia: las señales la invalidan en este proceso
+# y el TTL acota cuánto puede tardar en verse un cambio hecho en otro
+product_detail_cache = LocalLRUCache(
+    maxsize=settings.PRODUCTS_DETAIL_CACHE_SIZE,
+    timeout=settings.PRODUCTS_DETAIL_CACHE_TIMEOUT,
+)
+
+
+def _load_product_detail(pk):
+    row = compiled_product_serializer.values_list(
+        Product.objects.filter(pk=pk, is_active=True), extra=('updated_at',)
+    ).first()
+    if row is None:
+        return None
+    return compiled_product_serializer.to_representation_row(row), row.updated_at
+
+
+def get_product_detail(pk):
+    """
+    Devuelve (payload serializado, updated_at) de un producto activo, o None
+    si no existe. Los productos más consultados se sirven sin ir a la base.
+    """
+    return product_detail_cache.get_or_load(pk, lambda: _load_product_detail(pk))
+
+
+def invalidate_product_detail(pk):
+    """
+    Invalida ahora y de nuevo al confirmar la transacción, por si otra
+    petición recargó el producto con los datos anteriores mientras tanto.
+    """
+    product_detail_cache.invalidate(pk)
+    transaction.on_commit(lambda: product_detail_cache.invalidate(pk))
+
+
+def _request_fingerprint(request, kwargs):
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+    )
+    # Las respuestas paginadas incluyen URLs absolutas: el host forma parte de la huella
+    return '|'.join([
+        request.build_absolute_uri(request.path),
+        request.accepted_renderer.format,
+        repr(sorted(kwargs.items())),
+        repr(params),
+    ])
+
+
+def _response_cache_key(namespace, request, kwargs):
+    digest = hashlib.md5(_request_fingerprint(request, kwargs).encode('utf-8')).hexdigest()
+    return f'products:{namespace}:v{get_catalog_version()}:{digest}'
+
+
+def cache_catalog_response(namespace):
+    """
+    Guarda los bytes renderizados de las respuestas 200 de una vista del
+    catálogo. La clave incluye la versión del catálogo, que se incrementa al
+    guardar o eliminar un Product, por lo que nunca se sirven datos obsoletos.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            key = _response_cache_key(namespace, request, kwargs)
+            cached = cache.get(key)
+            if cached is not None:
+                _incr(CACHE_HITS_KEY)
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            _incr(CACHE_MISSES_KEY)
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                def store(rendered):
+                    cache.set(
+                        key,
+                        (rendered.content, rendered['Content-Type']),
+                        timeout=settings.PRODUCTS_CACHE_TIMEOUT,
+                    )
+                response.add_post_render_callback(store)
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def catalog_state(**kwargs):
+    """
+    Estado del catálogo completo en una sola consulta agregada: cualquier
+    guardado mueve MAX(updated_at) y cualquier borrado cambia el conteo.
+    """
+    state = Product.objects.aggregate(last_modified=Max('updated_at'), count=Count('id'))
+    return state['last_modified'], state['count']
+
+
+def product_state(pk, **kwargs):
+    """Estado de un único producto activo, leído de la caché LRU del detalle"""
+    detail = get_product_detail(pk)
+    return (detail[1] if detail is not None else None), 1
+
+
+def conditional_catalog_response(state_func, use_last_modified=False):
+    """
+    Responde 304 Not Modified a If-None-Match sin serializar nada. El ETag
+    combina el estado devuelto por `state_func` con la huella de la
+    petición, por lo que es fuerte: la misma huella y el mismo estado
+    producen exactamente los mismos bytes.
+
+    Last-Modified / If-Modified-Since solo se usan con `use_last_modified`:
+    la fecha sale de MAX(updated_at), que un borrado no mueve, así que en
+    los listados solo el conteo (incluido en el ETag) lo detecta y un 304
+    por fecha podría ocultarlo. Basta para un único producto, que al
+    desaparecer responde 404.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            last_modified, count = state_func(**kwargs)
+            if last_modified is None:
+                # Catálogo vacío o producto inexistente: la vista decide
+                return view_method(self, request, *args, **kwargs)
+
+            raw = '|'.join([
+                last_modified.isoformat(),
+                str(count),
+                _request_fingerprint(request, kwargs),
+            ])
+            etag = '"%s"' % hashlib.md5(raw.encode('utf-8')).hexdigest()
+            timestamp = int(last_modified.timestamp()) if use_last_modified else None
+
+            response = get_conditional_response(
+                request, etag=etag, last_modified=timestamp
+            )
+            if response is None:
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+
+            response['ETag'] = etag
+            if use_last_modified:
+                response['Last-Modified'] = http_date(timestamp)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,35 @@
+"""
+Verificaciones de sistema para la app de productos
+"""
+from django.core import checks
+
+from .models import Product
+from .services import PRODUCT_ORDERINGS
+
+
+def _backs_ordering(index, field_name):
+    """
+    Un índice respalda el ordenamiento si empieza por (campo, id) con la
+    misma dirección en ambas columnas, ya que así puede recorrerse en
+    cualquiera de los dos sentidos.
+    """
+    columns = [name.lstrip('-') for name in index.fields]
+    directions = {name.startswith('-') for name in index.fields[:2]}
+    return columns[:2] == [field_name, 'id'] and len(directions) == 1
+
+
+@checks.register(checks.Tags.models)
+def check_product_orderings_indexed(app_configs, **kwargs):
+    errors = []
+    for ordering in PRODUCT_ORDERINGS:
+        field_name = ordering.lstrip('-')
+        if not any(_backs_ordering(index, field_name) for index in Product._meta.indexes):
+            errors.append(
+                checks.Error(
+                    f"El ordenamiento '{ordering}' no está respaldado por un índice.",
+                    hint=f"Agrega un índice sobre ('{field_name}', 'id') en Product.Meta.indexes.",
+                    obj=Product,
+                    id='products.E001',
+                )
+            )
+    return errors
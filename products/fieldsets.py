@@ -0,0 +1,97 @@
+"""
+Selección de campos dispersa (?fields= / ?omit=) para las respuestas
+"""
+from rest_framework import serializers
+
+FIELDS_QUERY_PARAM = 'fields'
+OMIT_QUERY_PARAM = 'omit'
+
+
+def parse_fieldset(value):
+    """
+    Convierte 'id,items.quantity,items.product.name' en un árbol
+    {'id': {}, 'items': {'quantity': {}, 'product': {'name': {}}}}.
+    Devuelve None si el parámetro no se envió.
+    """
+    if value is None:
+        return None
+    tree = {}
+    for path in value.split(','):
+        path = path.strip()
+        if not path:
+            continue
+        node = tree
+        for name in path.split('.'):
+            node = node.setdefault(name, {})
+    return tree
+
+
+def get_fieldset_params(request):
+    """Árboles (fields, omit) de la petición"""
+    return (
+        parse_fieldset(request.query_params.get(FIELDS_QUERY_PARAM)),
+        parse_fieldset(request.query_params.get(OMIT_QUERY_PARAM)),
+    )
+
+
+def resolve_fieldset(available, fields=None, omit=None, prefix=''):
+    """
+    Devuelve los nombres de `available` que quedan tras aplicar los árboles
+    `fields` y `omit`, conservando el orden original. Un nombre desconocido
+    produce un error de validación (400) en lugar de ignorarse.
+    """
+    for param, tree in ((FIELDS_QUERY_PARAM, fields), (OMIT_QUERY_PARAM, omit)):
+        unknown = [name for name in (tree or {}) if name not in available]
+        if unknown:
+            raise serializers.ValidationError({
+                param: [
+                    f"Campo desconocido: '{prefix}{name}'. "
+                    f"Disponibles: {', '.join(prefix + field for field in available)}"
+                    for name in unknown
+                ]
+            })
+
+    selected = []
+    for name in available:
+        if fields is not None and name not in fields:
+            continue
+        # En omit solo las hojas eliminan el campo; las ramas se aplican al anidado
+        if omit is not None and name in omit and not omit[name]:
+            continue
+        selected.append(name)
+    return selected
+
+
+def _subtree(tree, name):
+    if tree is None or not tree.get(name):
+        return None
+    return tree[name]
+
+
+class SparseFieldsetMixin:
+    """
+    Permite construir el serializer con `fields=` / `omit=` (árboles de
+    parse_fieldset) y propaga las ramas a los serializers anidados.
+    """
+
+    def __init__(self, *args, fields=None, omit=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.apply_fieldset(fields, omit)
+
+    def apply_fieldset(self, fields=None, omit=None, prefix=''):
+        if fields is None and omit is None:
+            return
+        readable = [name for name, field in self.fields.items() if not field.write_only]
+        keep = resolve_fieldset(readable, fields, omit, prefix)
+        for name in readable:
+            if name not in keep:
+                self.fields.pop(name)
+                continue
+
+            nested = self.fields[name]
+            if isinstance(nested, serializers.ListSerializer):
+                nested = nested.child
+            if hasattr(nested, 'apply_fieldset'):
+                nested.apply_fieldset(
+                    _subtree(fields, name), _subtree(omit, name), f'{prefix}{name}.'
+                )
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from products.models import Product
+from products.serializers import ProductSerializer, compiled_product_serializer
+
+
+class Command(BaseCommand):
+    help = 'Comparar ProductSerializer(many=True) con la ruta compilada de solo lectura'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=1000, help='Productos a serializar por corrida')
+        parser.add_argument('--repeat', type=int, default=5, help='Corridas por serializador (se toma la mejor)')
+
+    def _best_of(self, repeat, func):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def handle(self, *args, **options):
+        queryset = Product.objects.order_by('-created_at', '-id')[:options['limit']]
+        count = queryset.count()
+        if not count:
+            raise CommandError('No hay productos. Ejecuta primero populate_products.')
+
+        renderer = JSONRenderer()
+
+        drf_time, drf_bytes = self._best_of(
+            options['repeat'],
+            lambda: renderer.render(ProductSerializer(queryset, many=True).data),
+        )
+        fast_time, fast_bytes = self._best_of(
+            options['repeat'],
+            lambda: renderer.render(
+                compiled_product_serializer.to_representation(
+                    compiled_product_serializer.values_list(queryset)
+                )
+            ),
+        )
+
+        if drf_bytes != fast_bytes:
+            raise CommandError('La ruta compilada no produce el mismo JSON que ProductSerializer')
+
+        self.stdout.write(f'Productos serializados: {count}')
+        self.stdout.write(f'ProductSerializer:      {drf_time * 1000:.1f} ms')
+        self.stdout.write(f'Ruta compilada:         {fast_time * 1000:.1f} ms')
+        self.stdout.write(
+            self.style.SUCCESS(f'\n✓ JSON idéntico, {drf_time / fast_time:.1f}x más rápido')
+        )
@@ -0,0 +1,50 @@
+import gzip
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from products.models import Product
+from products.services import EXPORT_FORMATS, iter_product_export
+
+
+class Command(BaseCommand):
+    help = 'Exportar el catálogo de productos activos en NDJSON o JSON con memoria constante'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='ndjson', dest='export_format')
+        parser.add_argument('--output', default='-', help='Archivo de salida ("-" para stdout)')
+        parser.add_argument('--gzip', action='store_true', help='Comprimir la salida con gzip')
+        parser.add_argument('--chunk-size', type=int, default=settings.PRODUCTS_EXPORT_CHUNK_SIZE)
+        parser.add_argument('--include-inactive', action='store_true', help='Incluir productos inactivos')
+
+    def handle(self, *args, **options):
+        queryset = Product.objects.all()
+        if not options['include_inactive']:
+            queryset = queryset.filter(is_active=True)
+
+        chunks = iter_product_export(
+            queryset,
+            export_format=options['export_format'],
+            chunk_size=options['chunk_size'],
+        )
+
+        if options['output'] == '-':
+            raw = sys.stdout.buffer
+        else:
+            raw = open(options['output'], 'wb')
+
+        stream = gzip.GzipFile(fileobj=raw, mode='wb') if options['gzip'] else raw
+        try:
+            for chunk in chunks:
+                stream.write(chunk.encode('utf-8'))
+        finally:
+            if stream is not raw:
+                stream.close()
+            if raw is not sys.stdout.buffer:
+                raw.close()
+            else:
+                raw.flush()
+
+        if options['output'] != '-':
+            self.stderr.write(self.style.SUCCESS(f'✓ Catálogo exportado en {options["output"]}'))
@@ -0,0 +1,124 @@
+import random
+import time
+from array import array
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from cart.models import Cart, CartItem
+from products.cache import bump_catalog_version
+from products.models import Product
+
+CATEGORIES = [
+    'Laptop', 'Mouse', 'Teclado', 'Monitor', 'Webcam', 'Auriculares', 'SSD',
+    'Router', 'Hub USB-C', 'Mochila', 'Tablet', 'Impresora', 'Parlante', 'Micrófono',
+]
+BRANDS = [
+    'HP', 'Logitech', 'Samsung', 'Sony', 'TP-Link', 'Lenovo', 'Asus', 'Dell',
+    'Acer', 'Corsair', 'Kingston', 'Xiaomi', 'Razer', 'Epson',
+]
+ADJECTIVES = [
+    'inalámbrico', 'ergonómico', 'compacto', 'profesional', 'gamer', 'portátil',
+    'resistente', 'ultradelgado', 'silencioso', 'de alta velocidad',
+]
+
+
+class Command(BaseCommand):
+    help = 'Generar un conjunto de datos sintético y determinista para pruebas de carga'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10000, help='Productos a generar')
+        parser.add_argument('--carts', type=int, default=0, help='Carritos a generar')
+        parser.add_argument('--items-per-cart', type=int, default=5, help='Items por carrito')
+        parser.add_argument('--seed', type=int, default=42, help='Semilla para obtener siempre los mismos datos')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Filas por INSERT')
+
+    def _report(self, label, done, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'{label}: {done} ({done / elapsed:,.0f} filas/s)')
+
+    def _products(self, rng, seed, count):
+        for index in range(count):
+            category = rng.choice(CATEGORIES)
+            brand = rng.choice(BRANDS)
+            adjective = rng.choice(ADJECTIVES)
+            yield Product(
+                sku=f'SYN-{seed}-{index:09d}',
+                name=f'{category} {brand} {adjective} {index}',
+                description=f'{category} {adjective} de {brand}, modelo {rng.randint(100, 9999)}',
+                price=Decimal(rng.randint(499, 250000)) / 100,
+                stock=rng.choice((0, rng.randint(1, 500))),
+                is_active=rng.random() < 0.95,
+            )
+
+    def _insert(self, label, model, objects, batch_size):
+        """Inserta en lotes y devuelve los IDs generados"""
+        ids = array('q')
+        started = time.perf_counter()
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                ids.extend(self._flush(model, batch))
+                self._report(label, len(ids), started)
+                batch = []
+        if batch:
+            ids.extend(self._flush(model, batch))
+            self._report(label, len(ids), started)
+        return ids
+
+    def _flush(self, model, batch):
+        with transaction.atomic():
+            created = model.objects.bulk_create(batch)
+        return [obj.pk for obj in created if obj.pk is not None]
+
+    def handle(self, *args, **options):
+        seed = options['seed']
+        products = options['products']
+        carts = options['carts']
+        items_per_cart = options['items_per_cart']
+        batch_size = options['batch_size']
+
+        if Product.objects.filter(sku__startswith=f'SYN-{seed}-').exists():
+            raise CommandError(f'Ya existen datos sintéticos con la semilla {seed}; usa otra --seed.')
+        if carts and items_per_cart > products:
+            raise CommandError('--items-per-cart no puede superar --products')
+
+        rng = random.Random(seed)
+        started = time.perf_counter()
+
+        product_ids = self._insert(
+            'Productos', Product, self._products(rng, seed, products), batch_size
+        )
+        # bulk_create no emite señales: se invalida la caché del catálogo a mano
+        bump_catalog_version()
+
+        if carts:
+            cart_ids = self._insert(
+                'Carritos',
+                Cart,
+                (
+                    Cart(session_id=f'syn-{seed}-{index}', is_saved=rng.random() < 0.3)
+                    for index in range(carts)
+                ),
+                batch_size,
+            )
+            self._insert(
+                'Items de carrito',
+                CartItem,
+                (
+                    CartItem(cart_id=cart_id, product_id=product_id, quantity=rng.randint(1, 5))
+                    for cart_id in cart_ids
+                    for product_id in rng.sample(product_ids, items_per_cart)
+                ),
+                batch_size,
+            )
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\n✓ Datos generados en {elapsed:.1f}s: {products} productos, '
+                f'{carts} carritos, {carts * items_per_cart} items (semilla {seed})'
+            )
+        )
@@ -0,0 +1,102 @@
+# Generated by Django 5.2.10 on 2026-10-18 10:13
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+POSTGRES_FORWARDS = [
+    """
+    CREATE OR REPLACE FUNCTION products_product_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('spanish', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('spanish', coalesce(NEW.description, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE TRIGGER products_product_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, description ON products_product
+    FOR EACH ROW EXECUTE FUNCTION products_product_search_vector_update();
+    """,
+    # Dispara el trigger sobre las filas existentes
+    "UPDATE products_product SET name = name;",
+    "CREATE INDEX products_product_search_vector_gin ON products_product USING gin (search_vector);",
+    "CREATE INDEX products_product_name_trgm ON products_product USING gin (name gin_trgm_ops);",
+]
+
+POSTGRES_BACKWARDS = [
+    "DROP INDEX IF EXISTS products_product_name_trgm;",
+    "DROP INDEX IF EXISTS products_product_search_vector_gin;",
+    "DROP TRIGGER IF EXISTS products_product_search_vector_trigger ON products_product;",
+    "DROP FUNCTION IF EXISTS products_product_search_vector_update();",
+]
+
+# Nota: si una migración futura obliga a SQLite a reconstruir la tabla
+# products_product, los triggers se pierden y deben volver a crearse.
+SQLITE_FORWARDS = [
+    """
+    CREATE VIRTUAL TABLE products_product_fts USING fts5(
+        name, description,
+        content='products_product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    );
+    """,
+    """
+    CREATE TRIGGER products_product_fts_insert AFTER INSERT ON products_product BEGIN
+        INSERT INTO products_product_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END;
+    """,
+    """
+    CREATE TRIGGER products_product_fts_delete AFTER DELETE ON products_product BEGIN
+        INSERT INTO products_product_fts(products_product_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END;
+    """,
+    """
+    CREATE TRIGGER products_product_fts_update AFTER UPDATE OF name, description ON products_product BEGIN
+        INSERT INTO products_product_fts(products_product_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO products_product_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END;
+    """,
+    "INSERT INTO products_product_fts(products_product_fts) VALUES ('rebuild');",
+]
+
+SQLITE_BACKWARDS = [
+    "DROP TRIGGER IF EXISTS products_product_fts_update;",
+    "DROP TRIGGER IF EXISTS products_product_fts_delete;",
+    "DROP TRIGGER IF EXISTS products_product_fts_insert;",
+    "DROP TABLE IF EXISTS products_product_fts;",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(
+            _run({'postgresql': POSTGRES_FORWARDS, 'sqlite': SQLITE_FORWARDS}),
+            _run({'postgresql': POSTGRES_BACKWARDS, 'sqlite': SQLITE_BACKWARDS}),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.10 on 2026-10-18 10:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_updated_index'),
+    ]
+
+    # La columna se agrega sin UNIQUE y el índice único se crea aparte: así
+    # SQLite no reconstruye la tabla (lo que borraría los triggers FTS de la
+    # migración 0002) y el resultado es el mismo en ambos motores.
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='sku',
+            field=models.CharField(blank=True, max_length=64, null=True, verbose_name='SKU'),
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'CREATE UNIQUE INDEX products_product_sku_uniq ON products_product (sku);',
+                    'DROP INDEX products_product_sku_uniq;',
+                ),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='product',
+                    name='sku',
+                    field=models.CharField(blank=True, max_length=64, null=True, unique=True, verbose_name='SKU'),
+                ),
+            ],
+        ),
+    ]
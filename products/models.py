@@ -1,8 +1,10 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 # Create your models here.
 
 class Product(models.Model):
+    sku = models.CharField(max_length=64, unique=True, blank=True, null=True, verbose_name="SKU")
     name = models.CharField(max_length=200, verbose_name="Nombre")
     description = models.TextField(blank=True, verbose_name="Descripción")
     price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Precio")
@@ -11,11 +13,39 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True, verbose_name="Activo")
+    # Mantenido por un trigger de base de datos (ver migración 0002)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         verbose_name = "Producto"
         verbose_name_plural = "Productos"
         ordering = ['-created_at']
+        # Índices parciales para las consultas de los listados: todas filtran
+        # is_active=True y paginan por (campo de ordenamiento, id)
+        indexes = [
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(is_active=True),
+                name='product_active_created_idx',
+            ),
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(is_active=True, stock__gt=0),
+                name='product_instock_created_idx',
+            ),
+            models.Index(
+                fields=['price', 'id'],
+                condition=models.Q(is_active=True),
+                name='product_active_price_idx',
+            ),
+            models.Index(
+                fields=['name', 'id'],
+                condition=models.Q(is_active=True),
+                name='product_active_name_idx',
+            ),
+            # Respalda MAX(updated_at) de las peticiones condicionales
+            models.Index(fields=['updated_at'], name='product_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
\ No newline at end of file
@@ -0,0 +1,151 @@
+"""
+Paginación por cursor (keyset) para listados grandes
+"""
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Pagina por la clave (campo de ordenamiento, id) en lugar de OFFSET,
+    de modo que cualquier página cuesta lo mismo que la primera.
+    El cursor es opaco para el cliente y queda atado al ordenamiento usado.
+    Acepta tanto querysets de modelos como de `values_list(named=True)`.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Cursor inválido'
+
+    def __init__(self, ordering='-created_at', page_size=None, max_page_size=None):
+        self.ordering = ordering
+        self.default_page_size = page_size or settings.PRODUCTS_PAGE_SIZE
+        self.max_page_size = max_page_size or settings.PRODUCTS_MAX_PAGE_SIZE
+
+    def required_fields(self):
+        """Columnas que cada fila debe traer para construir el cursor"""
+        field_name = self.ordering.lstrip('-')
+        return [field_name] if field_name == 'id' else [field_name, 'id']
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.default_page_size
+        if page_size < 1:
+            return self.default_page_size
+        return min(page_size, self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        field_name = self.ordering.lstrip('-')
+        self.field_name = field_name
+        # Se admite ordenar tanto por campos del modelo como por anotaciones
+        if field_name in queryset.query.annotations:
+            self.field = queryset.query.annotations[field_name].output_field
+        else:
+            self.field = queryset.model._meta.get_field(field_name)
+        descending = self.ordering.startswith('-')
+
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor['reverse']
+
+        # Al retroceder se recorre el índice en sentido inverso
+        if reverse:
+            descending = not descending
+        prefix = '-' if descending else ''
+        lookup = 'lt' if descending else 'gt'
+
+        order_by = [f'{prefix}{field_name}']
+        if field_name != 'id':
+            order_by.append(f'{prefix}id')
+        queryset = queryset.order_by(*order_by)
+
+        if cursor is not None:
+            if field_name == 'id':
+                queryset = queryset.filter(**{f'id__{lookup}': cursor['id']})
+            else:
+                queryset = queryset.filter(
+                    Q(**{f'{field_name}__{lookup}': cursor['value']})
+                    | Q(**{field_name: cursor['value'], f'id__{lookup}': cursor['id']})
+                )
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        self.page = results
+        return results
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(
+                self.request.build_absolute_uri(), self.cursor_query_param
+            )
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def encode_cursor(self, instance, reverse):
+        value = getattr(instance, self.field_name)
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        elif value is not None and not isinstance(value, (int, float, str, bool)):
+            value = str(value)
+
+        payload = json.dumps(
+            {'o': self.ordering, 'v': value, 'id': getattr(instance, 'id'), 'r': int(reverse)},
+            separators=(',', ':'),
+        )
+        token = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, token
+        )
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+            if payload['o'] != self.ordering:
+                raise ValueError('El cursor pertenece a otro ordenamiento')
+            return {
+                'value': self.field.to_python(payload['v']),
+                'id': int(payload['id']),
+                'reverse': bool(payload['r']),
+            }
+        except (TypeError, ValueError, KeyError, UnicodeError,
+                binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
@@ -1,8 +1,213 @@
+from datetime import datetime
+from functools import cached_property
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
+from rest_framework.settings import ISO_8601, api_settings
+from .fieldsets import SparseFieldsetMixin, resolve_fieldset
 from .models import Product
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = ['id', 'name', 'description', 'price', 'stock', 'image_url', 'is_active', 'created_at']
-        read_only_fields = ['id', 'created_at']
\ No newline at end of file
+        read_only_fields = ['id', 'created_at']
+
+
+class ProductFilterSerializer(serializers.Serializer):
+    """Valida los filtros de los listados recibidos por query params"""
+    min_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    max_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    in_stock = serializers.BooleanField(required=False, allow_null=True, default=None)
+
+    def validate(self, data):
+        min_price = data.get('min_price')
+        max_price = data.get('max_price')
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise serializers.ValidationError("'min_price' no puede ser mayor que 'max_price'")
+        return data
+
+
+class ProductFacetsSerializer(ProductFilterSerializer):
+    """Filtros más el ancho de cada intervalo del histograma de precios"""
+    interval = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=1, required=False, default=50)
+
+
+class ProductImportSerializer(serializers.ModelSerializer):
+    """Valida filas de la importación masiva; el SKU identifica al producto"""
+    sku = serializers.CharField(max_length=64)
+
+    class Meta:
+        model = Product
+        fields = ['sku', 'name', 'description', 'price', 'stock', 'image_url', 'is_active']
+
+
+def _build_converter(field):
+    """
+    Devuelve una función `prepare()` que, una vez por lote, entrega un
+    conversor equivalente a `field.to_representation` con un atajo para los
+    tipos que la base de datos ya entrega en su forma final.
+    """
+    to_representation = field.to_representation
+
+    if isinstance(field, serializers.BooleanField):
+        convert = lambda value: value if value.__class__ is bool else to_representation(value)
+        return lambda: convert
+    if isinstance(field, serializers.IntegerField):
+        convert = lambda value: value if value.__class__ is int else to_representation(value)
+        return lambda: convert
+    if isinstance(field, serializers.CharField):
+        convert = lambda value: value if value.__class__ is str else to_representation(value)
+        return lambda: convert
+    if (isinstance(field, serializers.DecimalField)
+            and getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+            and not field.localize and not field.normalize_output):
+        exponent = -field.decimal_places
+
+        def convert_decimal(value):
+            # Un Decimal ya cuantizado a decimal_places no cambia al cuantizar
+            if value.__class__ is not str and value.as_tuple().exponent == exponent:
+                return f'{value:f}'
+            return to_representation(value)
+        return lambda: convert_decimal
+    if (isinstance(field, serializers.DateTimeField)
+            and getattr(field, 'format', api_settings.DATETIME_FORMAT).lower() == ISO_8601):
+        def prepare_datetime():
+            # La zona horaria activa se resuelve una vez por lote y no por fila
+            field_timezone = (
+                field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+            )
+            if field_timezone is None:
+                return to_representation
+
+            def convert_datetime(value):
+                if value.__class__ is not datetime or value.tzinfo is None:
+                    return to_representation(value)
+                text = value.astimezone(field_timezone).isoformat()
+                return text[:-6] + 'Z' if text.endswith('+00:00') else text
+            return convert_datetime
+        return prepare_datetime
+    return lambda: to_representation
+
+
+class CompiledReadSerializer:
+    """
+    Ruta rápida de solo lectura para un ModelSerializer plano. Lee con
+    `values_list()` exactamente las columnas de Meta.fields y las convierte
+    con funciones precalculadas por columna, sin instanciar modelos ni pasar
+    por la maquinaria de campos de DRF. Produce el mismo JSON que
+    `serializer_class(queryset, many=True).data`.
+    """
+
+    def __init__(self, serializer_class, fields=None):
+        self.serializer_class = serializer_class
+        self.selected = fields
+        self._projections = {}
+
+    @cached_property
+    def available(self):
+        return [
+            name for name, field in self.serializer_class().fields.items()
+            if not field.write_only
+        ]
+
+    def project(self, fields=None, omit=None, prefix=''):
+        """
+        Variante que solo lee y emite los campos elegidos con los árboles
+        `fields` / `omit` de parse_fieldset. Las variantes se reutilizan.
+        """
+        if fields is None and omit is None:
+            return self
+        selected = tuple(resolve_fieldset(self.available, fields, omit, prefix))
+        if selected not in self._projections:
+            self._projections[selected] = CompiledReadSerializer(self.serializer_class, selected)
+        return self._projections[selected]
+
+    @cached_property
+    def _compiled(self):
+        model = self.serializer_class.Meta.model
+        names, sources, preparers = [], [], []
+
+        for name, field in self.serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if self.selected is not None and name not in self.selected:
+                continue
+            try:
+                model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(
+                    f"{self.serializer_class.__name__}.{name} no es una columna de "
+                    f"{model.__name__} y no puede compilarse"
+                )
+            names.append(name)
+            sources.append(field.source)
+            preparers.append(_build_converter(field))
+
+        return names, sources, preparers
+
+    @property
+    def sources(self):
+        return self._compiled[1]
+
+    def values_list(self, queryset, extra=()):
+        """
+        Filas (namedtuples) con las columnas del serializer, más `extra` y
+        las anotaciones del queryset para que el paginador pueda leerlas.
+        """
+        columns = list(self.sources)
+        for name in [*extra, *queryset.query.annotations]:
+            if name not in columns:
+                columns.append(name)
+        return queryset.values_list(*columns, named=True)
+
+    def to_representation(self, rows):
+        names, _, preparers = self._compiled
+        converters = [prepare() for prepare in preparers]
+        columns = list(zip(range(len(names)), names, converters))
+        return [
+            {
+                name: None if row[index] is None else convert(row[index])
+                for index, name, convert in columns
+            }
+            for row in rows
+        ]
+
+    def narrow(self, data):
+        """Recorta un payload completo a los campos de esta variante"""
+        if self.selected is None:
+            return data
+        return {name: data[name] for name in self.selected}
+
+    def to_representation_row(self, row):
+        return self.to_representation([row])[0]
+
+    def to_representation_instance(self, instance):
+        """Serializa una instancia ya cargada (p. ej. un producto anidado)"""
+        names, sources, preparers = self._compiled
+        data = {}
+        for name, source, prepare in zip(names, sources, preparers):
+            convert = prepare()
+            value = getattr(instance, source)
+            data[name] = None if value is None else convert(value)
+        return data
+
+
+compiled_product_serializer = CompiledReadSerializer(ProductSerializer)
+
+
+@extend_schema_field(ProductSerializer)
+class CompiledProductField(serializers.Field):
+    """Campo anidado de solo lectura que serializa un Product por la ruta rápida"""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+        self.compiled = compiled_product_serializer
+
+    def apply_fieldset(self, fields=None, omit=None, prefix=''):
+        self.compiled = compiled_product_serializer.project(fields, omit, prefix)
+
+    def to_representation(self, value):
+        return self.compiled.to_representation_instance(value)
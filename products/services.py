@@ -0,0 +1,289 @@
+"""
+Lógica de negocio de productos
+"""
+import re
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramWordSimilarity,
+)
+from django.db import connection
+from django.db.models import Count, F, FloatField, Max, Min, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Floor
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Product
+from .serializers import compiled_product_serializer
+
+# Configuración de texto usada por la columna tsvector (ver migración 0002)
+SEARCH_CONFIG = 'spanish'
+
+# Tabla virtual FTS5 que reemplaza al tsvector cuando se usa SQLite
+SQLITE_FTS_TABLE = 'products_product_fts'
+
+# Ordenamientos expuestos por ProductListView (el primero es el de por
+# defecto); cada uno debe estar respaldado por un índice (ver products.checks)
+# y el paginador agrega el id como desempate
+PRODUCT_ORDERINGS = ['-created_at', 'created_at', 'name', '-name', 'price', '-price']
+
+# Solo tiene sentido junto con una búsqueda (ver search_products)
+RELEVANCE_ORDERING = 'relevance'
+
+PRICE_QUANTUM = Decimal('0.01')
+
+
+def resolve_product_ordering(value, searching=False):
+    """
+    Traduce el parámetro `ordering` a uno de los ordenamientos declarados.
+    Cualquier otro valor se rechaza con un error de validación (400) en lugar
+    de llegar a order_by y provocar un ordenamiento sin índice o un 500.
+    """
+    if not value:
+        return PRODUCT_ORDERINGS[0]
+    if value == RELEVANCE_ORDERING:
+        return '-relevance' if searching else PRODUCT_ORDERINGS[0]
+    if value not in PRODUCT_ORDERINGS:
+        raise serializers.ValidationError({
+            'ordering': [
+                f"Ordenamiento no soportado: '{value}'. "
+                f"Opciones: {', '.join([*PRODUCT_ORDERINGS, RELEVANCE_ORDERING])}"
+            ]
+        })
+    return value
+
+
+def _search_terms(term):
+    """Normaliza el texto de búsqueda a una lista de palabras sin operadores"""
+    return re.findall(r'\w+', term.lower())
+
+
+def search_products(queryset, term):
+    """
+    Filtra por búsqueda de texto completo (nombre + descripción, ponderados)
+    y anota `relevance`, donde un valor mayor indica mejor coincidencia.
+
+    En PostgreSQL usa la columna tsvector con índice GIN y, para tolerar
+    errores de tipeo, similitud por trigramas sobre el nombre. En SQLite
+    usa la tabla FTS5 mantenida por triggers.
+    """
+    terms = _search_terms(term)
+    if not terms:
+        return queryset.none()
+
+    if connection.vendor == 'postgresql':
+        # Cada palabra se busca como prefijo para soportar el tipeo incremental
+        query = SearchQuery(
+            ' & '.join(f'{word}:*' for word in terms),
+            config=SEARCH_CONFIG,
+            search_type='raw',
+        )
+        return queryset.filter(
+            Q(search_vector=query) | Q(name__trigram_word_similar=term)
+        ).annotate(
+            # SearchRank y la similitud son `real` (4 bytes); en doble precisión
+            # el valor que guarda el cursor de paginación vuelve a compararse
+            # igual que se leyó y el desempate por ID no se pierde
+            relevance=Cast(
+                SearchRank(F('search_vector'), query) + TrigramWordSimilarity(term, 'name'),
+                FloatField(),
+            ),
+        )
+
+    match = ' '.join(f'"{word}"*' for word in terms)
+    # bm25 devuelve valores negativos (menor es mejor); se invierte el signo
+    return queryset.filter(
+        id__in=RawSQL(
+            f'SELECT rowid FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s',
+            (match,),
+        )
+    ).annotate(
+        relevance=RawSQL(
+            f'SELECT -bm25({SQLITE_FTS_TABLE}, 10.0, 1.0) FROM {SQLITE_FTS_TABLE} '
+            f'WHERE {SQLITE_FTS_TABLE} MATCH %s '
+            f'AND {SQLITE_FTS_TABLE}.rowid = products_product.id',
+            (match,),
+            output_field=FloatField(),
+        ),
+    )
+
+
+def filter_products(queryset, filters):
+    """Aplica los filtros validados por ProductFilterSerializer"""
+    if filters.get('min_price') is not None:
+        queryset = queryset.filter(price__gte=filters['min_price'])
+    if filters.get('max_price') is not None:
+        queryset = queryset.filter(price__lte=filters['max_price'])
+    if filters.get('in_stock') is True:
+        queryset = queryset.filter(stock__gt=0)
+    elif filters.get('in_stock') is False:
+        queryset = queryset.filter(stock=0)
+    return queryset
+
+
+def _price(value):
+    # Mismo formato que Product.price en las respuestas ("12.50")
+    return f'{Decimal(value).quantize(PRICE_QUANTUM):f}'
+
+
+def product_facets(queryset, interval):
+    """
+    Histograma de precios por intervalos de ancho fijo y conteos de stock,
+    calculados en una única consulta agrupada sobre el índice de precio.
+    """
+    buckets = list(
+        queryset.order_by()
+        .annotate(bucket=Floor(F('price') / Value(interval)))
+        .values('bucket')
+        .annotate(
+            count=Count('id'),
+            in_stock=Count('id', filter=Q(stock__gt=0)),
+            min_price=Min('price'),
+            max_price=Max('price'),
+        )
+        .order_by('bucket')
+    )
+
+    total = sum(bucket['count'] for bucket in buckets)
+    in_stock = sum(bucket['in_stock'] for bucket in buckets)
+    return {
+        'count': total,
+        'in_stock': in_stock,
+        'out_of_stock': total - in_stock,
+        'price': {
+            'min': _price(buckets[0]['min_price']) if buckets else None,
+            'max': _price(buckets[-1]['max_price']) if buckets else None,
+        },
+        'histogram': [
+            {
+                'min': _price(int(bucket['bucket']) * interval),
+                'max': _price((int(bucket['bucket']) + 1) * interval),
+                'count': bucket['count'],
+                'in_stock': bucket['in_stock'],
+            }
+            for bucket in buckets
+        ],
+    }
+
+
+def parse_id_list(value, max_ids):
+    """
+    Convierte '3,1,2' en [3, 1, 2] conservando el orden y sin duplicados.
+    Lanza ValidationError (400) si está vacío, no son enteros o supera max_ids.
+    """
+    ids = []
+    for part in (value or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if not part.isdigit():
+            raise serializers.ValidationError({'ids': [f"ID inválido: '{part}'"]})
+        ids.append(int(part))
+
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise serializers.ValidationError({'ids': ['Debe indicar al menos un ID']})
+    if len(ids) > max_ids:
+        raise serializers.ValidationError({'ids': [f'Máximo {max_ids} IDs por consulta']})
+    return ids
+
+
+def get_products_by_ids(queryset, ids, serializer):
+    """
+    Resuelve todos los IDs con una sola consulta IN y devuelve
+    (resultados en el orden pedido, IDs no encontrados).
+    """
+    found = queryset.only(*serializer.sources).in_bulk(ids)
+    results = [serializer.to_representation_instance(found[pk]) for pk in ids if pk in found]
+    missing = [pk for pk in ids if pk not in found]
+    return results, missing
+
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+
+def iter_product_export(queryset, export_format='ndjson', chunk_size=2000):
+    """
+    Genera el catálogo serializado por trozos de texto. Las filas se leen con
+    `iterator(chunk_size)` (cursor del lado del servidor en PostgreSQL), por
+    lo que la memoria usada no depende del tamaño del catálogo.
+    """
+    rows = compiled_product_serializer.values_list(queryset.order_by('id')).iterator(
+        chunk_size=chunk_size
+    )
+    encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+    if export_format == 'json':
+        yield '['
+    first = True
+    while True:
+        batch = list(islice(rows, chunk_size))
+        if not batch:
+            break
+        lines = [encoder.encode(item) for item in compiled_product_serializer.to_representation(batch)]
+        if export_format == 'json':
+            yield ('' if first else ',') + ','.join(lines)
+        else:
+            yield '\n'.join(lines) + '\n'
+        first = False
+    if export_format == 'json':
+        yield ']'
+
+
+# Columnas que una importación sobrescribe cuando el SKU ya existe
+IMPORT_UPDATE_FIELDS = ['name', 'description', 'price', 'stock', 'image_url', 'is_active', 'updated_at']
+
+# Columnas sin valor por defecto: una fila sin ellas solo puede actualizar un SKU existente
+IMPORT_REQUIRED_FIELDS = {'name', 'price'}
+
+
+def upsert_products(rows):
+    """
+    Inserta o actualiza por SKU un lote de filas ya validadas con una
+    sentencia por cada combinación de columnas presentes: en los SKU
+    existentes solo se sobrescriben las columnas que trae la fila, las
+    ausentes conservan su valor (los SKU nuevos toman los valores por
+    defecto del modelo). Las filas completas usan INSERT ... ON CONFLICT
+    (sku) DO UPDATE; las parciales, que solo pueden referirse a SKU
+    existentes (ver el comando import_products), un UPDATE por lotes. Si un
+    SKU se repite en el lote gana la última fila. Devuelve la cantidad de
+    productos escritos.
+    """
+    by_sku = {row['sku']: row for row in rows}
+    by_columns = {}
+    for row in by_sku.values():
+        by_columns.setdefault(frozenset(row), []).append(row)
+
+    written = 0
+    for columns, group in by_columns.items():
+        update_fields = [field for field in IMPORT_UPDATE_FIELDS if field in columns or field == 'updated_at']
+        if IMPORT_REQUIRED_FIELDS <= columns:
+            Product.objects.bulk_create(
+                [Product(**row) for row in group],
+                update_conflicts=True,
+                unique_fields=['sku'],
+                update_fields=update_fields,
+            )
+            written += len(group)
+            continue
+
+        # El INSERT fallaría por las columnas NOT NULL ausentes antes de llegar al ON CONFLICT
+        products = Product.objects.only('id', 'sku').in_bulk([row['sku'] for row in group], field_name='sku')
+        now = timezone.now()
+        for row in group:
+            product = products.get(row['sku'])
+            if product is not None:
+                for field, value in row.items():
+                    setattr(product, field, value)
+                product.updated_at = now
+        Product.objects.bulk_update(products.values(), update_fields)
+        written += len(products)
+    return written
@@ -0,0 +1,29 @@
+"""
+Señales de la app de productos
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_catalog_version_on_commit, invalidate_product_detail
+from .models import Product
+from .suggest import refresh_suggestion, remove_suggestion
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_catalog_cache(sender, instance, **kwargs):
+    # bulk_create/update no emiten señales: quien los use debe invalidar a mano
+    bump_catalog_version_on_commit()
+    invalidate_product_detail(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+def refresh_suggest_index(sender, instance, **kwargs):
+    transaction.on_commit(lambda: refresh_suggestion(instance))
+
+
+@receiver(post_delete, sender=Product)
+def remove_from_suggest_index(sender, instance, **kwargs):
+    product_id = instance.pk
+    transaction.on_commit(lambda: remove_suggestion(product_id))
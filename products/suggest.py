@@ -0,0 +1,214 @@
+"""
+Índice de prefijos en memoria para el autocompletado de productos
+"""
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+
+from .models import Product
+
+
+# Resultados memorizados como máximo; al llenarse se vacía
+MEMO_SIZE = 4096
+
+# Mayor que cualquier carácter: (prefijo + _MAX_CHAR,) acota el rango del prefijo
+_MAX_CHAR = '\U0010ffff'
+
+
+def normalize(text):
+    """Minúsculas y sin tildes, para que 'cámara' y 'camara' coincidan"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def _keys(name):
+    """
+    Una clave por palabra, desde esa palabra hasta el final del nombre:
+    'Laptop HP Pavilion' -> 'laptop hp pavilion', 'hp pavilion', 'pavilion'.
+    Así 'hp pav' encuentra el producto aunque no empiece por 'hp'.
+    """
+    words = re.findall(r'\w+', normalize(name))
+    return [' '.join(words[index:]) for index in range(len(words))]
+
+
+class SuggestIndex:
+    """
+    Arreglo ordenado de (clave, id) consultado con bisect. Los resultados de
+    cada prefijo se memorizan hasta que cambia un producto que coincide con
+    él, de modo que los prefijos cortos (los más frecuentes al tipear) no
+    recorren miles de coincidencias en cada petición.
+    """
+
+    def __init__(self, rows=()):
+        self._entries = []
+        self._products = {}
+        self._memo = {}
+        self._lock = threading.Lock()
+        self.built_at = time.monotonic()
+        for product_id, name, popularity in rows:
+            self._products[product_id] = (name, popularity)
+            self._entries.extend((key, product_id) for key in _keys(name))
+        self._entries.sort()
+
+    def __len__(self):
+        return len(self._products)
+
+    def search(self, prefix, limit):
+        prefix = ' '.join(re.findall(r'\w+', normalize(prefix)))
+        if not prefix:
+            return []
+
+        with self._lock:
+            memo_key = (prefix, limit)
+            if memo_key in self._memo:
+                return self._memo[memo_key]
+
+            entries = self._entries
+            start = bisect_left(entries, (prefix,))
+            end = bisect_left(entries, (prefix + _MAX_CHAR,), start)
+            ids = {product_id for _, product_id in entries[start:end]}
+
+            products = self._products
+            top = heapq.nlargest(limit, ids, key=lambda pk: (products[pk][1], -pk))
+            results = [{'id': pk, 'name': products[pk][0]} for pk in top]
+            if len(self._memo) >= MEMO_SIZE:
+                self._memo.clear()
+            self._memo[memo_key] = results
+            return results
+
+    def _forget(self, name):
+        """Descarta solo los resultados memorizados de prefijos que afectan a `name`"""
+        keys = _keys(name)
+        for memo_key in [
+            memo_key for memo_key in self._memo
+            if any(key.startswith(memo_key[0]) for key in keys)
+        ]:
+            del self._memo[memo_key]
+
+    def _remove(self, product_id):
+        current = self._products.pop(product_id, None)
+        if current is None:
+            return None
+        self._forget(current[0])
+        for key in _keys(current[0]):
+            position = bisect_left(self._entries, (key, product_id))
+            if position < len(self._entries) and self._entries[position] == (key, product_id):
+                del self._entries[position]
+        return current[1]
+
+    def update(self, product_id, name, is_active):
+        """Refresca un producto; la popularidad se conserva hasta el próximo rebuild"""
+        with self._lock:
+            popularity = self._remove(product_id) or 0
+            if is_active:
+                self._products[product_id] = (name, popularity)
+                self._forget(name)
+                for key in _keys(name):
+                    insort(self._entries, (key, product_id))
+
+    def remove(self, product_id):
+        with self._lock:
+            self._remove(product_id)
+
+
+def build_suggest_index():
+    """Lee nombres de productos activos y su popularidad (veces agregados a un carrito)"""
+    rows = (
+        Product.objects.filter(is_active=True)
+        .annotate(popularity=Count('cartitem'))
+        .values_list('id', 'name', 'popularity')
+        .iterator(chunk_size=settings.PRODUCTS_EXPORT_CHUNK_SIZE)
+    )
+    return SuggestIndex(rows)
+
+
+_index = None
+_build_lock = threading.Lock()
+
+# Cambios recibidos por señales mientras se construye un índice nuevo:
+# {product_id: (nombre, activo)} o None si se eliminó. Se aplican al índice
+# nuevo antes de publicarlo para no perder lo ocurrido durante la lectura.
+_pending = None
+_pending_lock = threading.Lock()
+
+
+def _build_and_swap():
+    """Construye el índice y lo publica; debe llamarse con _build_lock tomado"""
+    global _index, _pending
+    with _pending_lock:
+        _pending = {}
+    try:
+        index = build_suggest_index()
+        with _pending_lock:
+            for product_id, change in _pending.items():
+                if change is None:
+                    index.remove(product_id)
+                else:
+                    index.update(product_id, *change)
+            _index = index
+    finally:
+        with _pending_lock:
+            _pending = None
+    return index
+
+
+def _rebuild_in_background():
+    """Reconstruye el índice en un hilo propio; libera _build_lock al terminar"""
+    try:
+        _build_and_swap()
+    finally:
+        # El hilo abrió su propia conexión a la base de datos
+        connection.close()
+        _build_lock.release()
+
+
+def get_suggest_index():
+    """
+    Índice del worker. Se construye en la primera consulta (la única que
+    espera) y se reconstruye por completo cada PRODUCTS_SUGGEST_REBUILD_INTERVAL
+    segundos para recoger cambios de otros procesos y la popularidad. La
+    reconstrucción corre en segundo plano: mientras tanto se sigue sirviendo
+    el índice anterior, y los cambios que llegan entre medio se aplican a
+    los dos.
+    """
+    index = _index
+    if index is not None and time.monotonic() - index.built_at < settings.PRODUCTS_SUGGEST_REBUILD_INTERVAL:
+        return index
+
+    if index is None:
+        with _build_lock:
+            return _index if _index is not None else _build_and_swap()
+
+    if _build_lock.acquire(blocking=False):
+        if _index is index:
+            threading.Thread(target=_rebuild_in_background, name='suggest-index-rebuild', daemon=True).start()
+        else:
+            _build_lock.release()
+    return index
+
+
+def _record(product_id, change):
+    """Anota el cambio si hay una construcción en curso; devuelve el índice publicado"""
+    with _pending_lock:
+        if _pending is not None:
+            _pending[product_id] = change
+        return _index
+
+
+def refresh_suggestion(product):
+    index = _record(product.pk, (product.name, product.is_active))
+    if index is not None:
+        index.update(product.pk, product.name, product.is_active)
+
+
+def remove_suggestion(product_id):
+    index = _record(product_id, None)
+    if index is not None:
+        index.remove(product_id)
@@ -1,3 +1,385 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+from django.utils.http import http_date
+from django.utils.timezone import override as override_timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from . import suggest
+from .cache import product_detail_cache
+from .fieldsets import parse_fieldset
+from .models import Product
+from .serializers import ProductSerializer, compiled_product_serializer
+from .services import PRODUCT_ORDERINGS
+
+
+class CatalogTestCase(APITestCase):
+    """Aísla las cachés del catálogo, que viven fuera de la transacción de cada prueba"""
+
+    def setUp(self):
+        cache.clear()
+        product_detail_cache.clear()
+
+    def walk(self, url):
+        """Sigue los enlaces `next` desde `url`; devuelve las páginas visitadas"""
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response.json())
+            url = pages[-1]['next']
+        return pages
+
+    def walk_back(self, url):
+        """Sigue los enlaces `previous` desde `url`"""
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response.json())
+            url = pages[-1]['previous']
+        return pages
+
+    @staticmethod
+    def ids(pages):
+        return [product['id'] for page in pages for product in page['results']]
+
+
+class KeysetPaginationTests(CatalogTestCase):
+    page_size = 4
+
+    def setUp(self):
+        super().setUp()
+        names = ['delta', 'alfa', 'charlie', 'bravo', 'alfa', 'eco', 'delta', 'foxtrot', 'bravo', 'golf', 'alfa']
+        prices = ['10.00', '5.50', '10.00', '99.99', '5.50', '0.01', '10.00', '42.00', '5.50', '10.00', '7.25']
+        for name, price in zip(names, prices):
+            Product.objects.create(name=name, description='Producto', price=Decimal(price), stock=3)
+        Product.objects.create(name='inactivo', description='Producto', price=Decimal('1.00'), is_active=False)
+        Product.objects.create(name='agotado', description='Producto', price=Decimal('2.00'), stock=0)
+        # Fechas repetidas para que el desempate por ID tenga que funcionar
+        created_at = timezone.now() - timedelta(days=1)
+        Product.objects.filter(name__in=['alfa', 'bravo']).update(created_at=created_at)
+
+    def expected_ids(self, ordering, **filters):
+        prefix = '-' if ordering.startswith('-') else ''
+        return list(
+            Product.objects.filter(is_active=True, **filters)
+            .order_by(ordering, f'{prefix}id')
+            .values_list('id', flat=True)
+        )
+
+    def test_forward_and_back_over_every_ordering(self):
+        for ordering in PRODUCT_ORDERINGS:
+            with self.subTest(ordering=ordering):
+                forward = self.walk(f'/api/products/?ordering={ordering}&page_size={self.page_size}')
+                expected = self.expected_ids(ordering)
+                self.assertEqual(self.ids(forward), expected)
+                self.assertTrue(all(len(page['results']) <= self.page_size for page in forward))
+                self.assertIsNone(forward[0]['previous'])
+
+                # Desde la última página hacia atrás se recorren las mismas páginas
+                backward = self.walk_back(forward[-1]['previous'])
+                self.assertEqual(
+                    [page['results'] for page in reversed(backward)],
+                    [page['results'] for page in forward[:-1]],
+                )
+
+    def test_active_view_only_lists_products_in_stock(self):
+        pages = self.walk(f'/api/products/active/?page_size={self.page_size}')
+        self.assertEqual(self.ids(pages), self.expected_ids('-created_at', stock__gt=0))
+
+    def test_product_created_between_pages_is_not_repeated(self):
+        first = self.client.get(f'/api/products/?ordering=price&page_size={self.page_size}').json()
+        Product.objects.create(name='nuevo', description='Producto', price=Decimal('0.00'), stock=1)
+        rest = self.walk(first['next'])
+
+        seen = self.ids([first, *rest])
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(len(seen), Product.objects.filter(is_active=True).count() - 1)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/products/?cursor=no-es-un-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_is_bound_to_its_ordering(self):
+        next_url = self.client.get(f'/api/products/?ordering=price&page_size={self.page_size}').json()['next']
+        response = self.client.get(next_url.replace('ordering=price', 'ordering=name'))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unsupported_ordering(self):
+        response = self.client.get('/api/products/?ordering=description')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ordering', response.json())
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Prueba el respaldo FTS5 de SQLite')
+class SQLiteSearchTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.laptop = Product.objects.create(
+            name='Laptop HP Pavilion', description='Portátil de 15 pulgadas', price=Decimal('899.99'), stock=5
+        )
+        self.mouse = Product.objects.create(
+            name='Mouse inalámbrico', description='Compatible con cualquier laptop', price=Decimal('19.90'), stock=5
+        )
+        self.camera = Product.objects.create(
+            name='Cámara réflex', description='Sensor de 24 megapíxeles', price=Decimal('650.00'), stock=5
+        )
+        Product.objects.create(
+            name='Laptop oculta', description='Inactiva', price=Decimal('100.00'), stock=5, is_active=False
+        )
+
+    def search(self, term, **params):
+        response = self.client.get('/api/products/', {'search': term, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [product['id'] for product in response.json()['results']]
+
+    def test_matches_name_and_description(self):
+        self.assertCountEqual(self.search('laptop'), [self.laptop.pk, self.mouse.pk])
+
+    def test_words_are_prefixes_and_all_must_match(self):
+        self.assertEqual(self.search('lap pav'), [self.laptop.pk])
+        self.assertEqual(self.search('laptop sensor'), [])
+
+    def test_ignores_case_accents_and_operators(self):
+        self.assertEqual(self.search('CAMARA'), [self.camera.pk])
+        self.assertEqual(self.search('megapixeles'), [self.camera.pk])
+        # Las comillas y operadores de FTS5 se descartan en lugar de producir un error
+        self.assertEqual(self.search('"réflex" -*'), [self.camera.pk])
+        self.assertEqual(self.search('!!!'), [])
+
+    def test_relevance_ranks_name_matches_first(self):
+        self.assertEqual(self.search('laptop', ordering='relevance'), [self.laptop.pk, self.mouse.pk])
+
+    def test_index_follows_updates_and_deletes(self):
+        Product.objects.filter(pk=self.camera.pk).update(name='Cámara compacta')
+        self.assertEqual(self.search('reflex'), [])
+        self.assertEqual(self.search('compacta'), [self.camera.pk])
+
+        self.laptop.delete()
+        self.assertEqual(self.search('laptop'), [self.mouse.pk])
+
+    def test_relevance_pagination_has_no_duplicates_or_gaps(self):
+        # Relevancias repetidas: el desempate por ID debe mantener el orden entre páginas
+        extra = [
+            Product.objects.create(name=f'Teclado {index}', description='Teclado mecánico', price=Decimal('30.00'), stock=1).pk
+            for index in range(7)
+        ]
+        forward = self.walk('/api/products/?search=teclado&ordering=relevance&page_size=3')
+        self.assertCountEqual(self.ids(forward), extra)
+        self.assertEqual(len(self.ids(forward)), len(extra))
+
+        backward = self.walk_back(forward[-1]['previous'])
+        self.assertEqual(
+            [page['results'] for page in reversed(backward)],
+            [page['results'] for page in forward[:-1]],
+        )
+
+
+class CompiledSerializerTests(APITestCase):
+    """La ruta compilada debe producir exactamente el mismo JSON que ProductSerializer"""
+
+    def setUp(self):
+        for name, price, image_url, is_active in [
+            ('Básico', Decimal('10'), None, True),
+            ('Con decimales', Decimal('10.5'), 'https://example.com/a.png', True),
+            ('Centavo', Decimal('0.01'), '', False),
+            ('Caro', Decimal('99999999.99'), 'https://example.com/b.png', True),
+            ('Ünïcødé 📦 "comillas"', Decimal('7.25'), None, True),
+        ]:
+            Product.objects.create(
+                name=name, description=f'Descripción de {name}\ncon salto', price=price,
+                stock=3, image_url=image_url, is_active=is_active,
+            )
+        self.queryset = Product.objects.order_by('id')
+
+    def assertSameJSON(self, compiled, expected):
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(compiled), renderer.render(expected))
+
+    def test_many_matches_product_serializer(self):
+        compiled = compiled_product_serializer.to_representation(
+            compiled_product_serializer.values_list(self.queryset)
+        )
+        self.assertSameJSON(compiled, ProductSerializer(self.queryset, many=True).data)
+
+    def test_matches_in_another_timezone(self):
+        with override_timezone('America/Lima'):
+            compiled = compiled_product_serializer.to_representation(
+                compiled_product_serializer.values_list(self.queryset)
+            )
+            self.assertSameJSON(compiled, ProductSerializer(self.queryset, many=True).data)
+
+    def test_instance_matches_product_serializer(self):
+        for product in self.queryset:
+            self.assertSameJSON(
+                compiled_product_serializer.to_representation_instance(product),
+                ProductSerializer(product).data,
+            )
+
+    def test_projection_matches_sparse_fieldset(self):
+        fields = parse_fieldset('id,price,created_at')
+        projected = compiled_product_serializer.project(fields)
+        self.assertSameJSON(
+            projected.to_representation(projected.values_list(self.queryset)),
+            ProductSerializer(self.queryset, many=True, fields=fields).data,
+        )
+
+
+class ResponseCacheTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(name='Monitor', description='27 pulgadas', price=Decimal('250.00'), stock=5)
+
+    def listing(self):
+        response = self.client.get('/api/products/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_repeated_request_is_a_hit(self):
+        first = self.listing()
+        second = self.listing()
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.content, first.content)
+
+    def test_query_params_are_part_of_the_key(self):
+        self.listing()
+        response = self.client.get('/api/products/?fields=id,name')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['results'], [{'id': self.product.pk, 'name': 'Monitor'}])
+
+    def test_product_save_invalidates_after_commit(self):
+        self.listing()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'Monitor curvo'
+            self.product.save()
+
+        response = self.listing()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['results'][0]['name'], 'Monitor curvo')
+
+    def test_stock_reservation_invalidates_after_commit(self):
+        self.listing()
+        self.assertEqual(self.client.get(f'/api/products/{self.product.pk}/').json()['stock'], 5)
+
+        body = {'items': [{'product_id': self.product.pk, 'quantity': 2}]}
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.post('/api/cart/save/', body, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(callbacks)
+
+        response = self.listing()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['results'][0]['stock'], 3)
+        self.assertEqual(self.client.get(f'/api/products/{self.product.pk}/').json()['stock'], 3)
+
+
+class ConditionalGetTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.first = Product.objects.create(name='Silla', description='Ergonómica', price=Decimal('120.00'), stock=4)
+        self.second = Product.objects.create(name='Mesa', description='Escritorio', price=Decimal('300.00'), stock=2)
+
+    def test_matching_etag_answers_not_modified(self):
+        response = self.client.get('/api/products/')
+        etag = response['ETag']
+
+        cached = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(cached['ETag'], etag)
+        self.assertEqual(cached.content, b'')
+
+    def test_etag_depends_on_the_request(self):
+        etag = self.client.get('/api/products/')['ETag']
+        response = self.client.get('/api/products/?ordering=price', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_delete_changes_the_etag(self):
+        # Borrar no mueve MAX(updated_at): solo el conteo incluido en el ETag lo detecta
+        etag = self.client.get('/api/products/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.delete()
+
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual([product['id'] for product in response.json()['results']], [self.second.pk])
+
+    def test_listings_ignore_if_modified_since(self):
+        response = self.client.get('/api/products/')
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.delete()
+        future = http_date((timezone.now() + timedelta(days=1)).timestamp())
+        response = self.client.get('/api/products/', HTTP_IF_MODIFIED_SINCE=future)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_detail_honours_if_modified_since(self):
+        response = self.client.get(f'/api/products/{self.first.pk}/')
+        last_modified = response['Last-Modified']
+
+        cached = self.client.get(f'/api/products/{self.first.pk}/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        past = http_date((self.first.updated_at - timedelta(days=1)).timestamp())
+        response = self.client.get(f'/api/products/{self.first.pk}/', HTTP_IF_MODIFIED_SINCE=past)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_deleted_product_detail_is_not_found(self):
+        url = f'/api/products/{self.first.pk}/'
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.delete()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SuggestIndexTests(APITestCase):
+    def setUp(self):
+        suggest._index = None
+        self.addCleanup(setattr, suggest, '_index', None)
+        self.laptop = Product.objects.create(name='Laptop HP', description='Portátil', price=Decimal('800.00'))
+        self.tablet = Product.objects.create(name='Tablet Lenovo', description='10 pulgadas', price=Decimal('300.00'))
+
+    def test_signal_updates_reach_the_published_index(self):
+        index = suggest.get_suggest_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.laptop.name = 'Notebook HP'
+            self.laptop.save()
+
+        self.assertIs(suggest.get_suggest_index(), index)
+        self.assertEqual(index.search('note', 10), [{'id': self.laptop.pk, 'name': 'Notebook HP'}])
+        self.assertEqual(index.search('laptop', 10), [])
+
+    def test_changes_during_a_rebuild_are_not_lost(self):
+        old_index = suggest.get_suggest_index()
+        build = suggest.build_suggest_index
+
+        def build_while_products_change():
+            # Las filas ya se leyeron: estos cambios solo llegan por señales
+            index = build()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.laptop.is_active = False
+                self.laptop.save()
+                self.tablet.name = 'Tablet Samsung'
+                self.tablet.save()
+            return index
+
+        with suggest._build_lock, mock.patch.object(suggest, 'build_suggest_index', build_while_products_change):
+            new_index = suggest._build_and_swap()
+
+        self.assertIs(suggest.get_suggest_index(), new_index)
+        self.assertIsNot(new_index, old_index)
+        for index in (old_index, new_index):
+            self.assertEqual(index.search('laptop', 10), [])
+            self.assertEqual(index.search('samsung', 10), [{'id': self.tablet.pk, 'name': 'Tablet Samsung'}])
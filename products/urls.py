@@ -1,8 +1,13 @@
 from django.urls import path
-from .views import ProductListView, ProductDetailView, ProductActiveView
+from .views import ProductListView, ProductDetailView, ProductActiveView, ProductCacheStatsView, ProductExportView, ProductFacetsView, ProductBatchView, ProductSuggestView
 
 urlpatterns = [
     path('products/', ProductListView.as_view(), name='product-list'),
     path('products/<int:pk>/', ProductDetailView.as_view(), name='product-detail'),
     path('products/active/', ProductActiveView.as_view(), name='product-active'),
+    path('products/suggest/', ProductSuggestView.as_view(), name='product-suggest'),
+    path('products/batch/', ProductBatchView.as_view(), name='product-batch'),
+    path('products/facets/', ProductFacetsView.as_view(), name='product-facets'),
+    path('products/export/', ProductExportView.as_view(), name='product-export'),
+    path('products/cache/stats/', ProductCacheStatsView.as_view(), name='product-cache-stats'),
 ]
\ No newline at end of file
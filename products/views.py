@@ -1,38 +1,82 @@
+import re
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.shortcuts import get_object_or_404
+from rest_framework.permissions import IsAdminUser
+from django.conf import settings
+from django.http import Http404, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
 
 from .models import Product
-from .serializers import ProductSerializer
+from .serializers import ProductFacetsSerializer, ProductFilterSerializer, compiled_product_serializer
+from .fieldsets import get_fieldset_params
+from .pagination import KeysetCursorPagination
+from .suggest import get_suggest_index
+from .services import (
+    EXPORT_FORMATS,
+    filter_products,
+    get_products_by_ids,
+    iter_product_export,
+    parse_id_list,
+    product_facets,
+    resolve_product_ordering,
+    search_products,
+)
+from .cache import (
+    cache_catalog_response,
+    catalog_state,
+    conditional_catalog_response,
+    get_cache_stats,
+    get_product_detail,
+    product_state,
+)
 
 # Importar decoradores de documentación
 from docs.decorators.swagger_decorators import (
     product_list_decorator,
     product_detail_decorator,
     product_active_decorator,
+    product_cache_stats_decorator,
+    product_export_decorator,
+    product_facets_decorator,
+    product_batch_decorator,
+    product_suggest_decorator,
 )
 
+re_accepts_gzip = re.compile(r"\bgzip\b")
+
 
 class ProductListView(APIView):
     """
-    GET: Listar todos los productos activos
+    GET: Listar todos los productos activos (paginado por cursor)
     """
     
     @product_list_decorator
+    @conditional_catalog_response(catalog_state)
+    @cache_catalog_response('list')
     def get(self, request):
-        products = Product.objects.filter(is_active=True)
+        filters = ProductFilterSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+        products = filter_products(Product.objects.filter(is_active=True), filters.validated_data)
         
         # Filtros opcionales
         search = request.query_params.get('search', None)
         if search:
-            products = products.filter(name__icontains=search)
+            products = search_products(products, search)
         
-        ordering = request.query_params.get('ordering', '-created_at')
-        products = products.order_by(ordering)
+        # La relevancia solo existe cuando hay búsqueda
+        ordering = resolve_product_ordering(request.query_params.get('ordering'), searching=bool(search))
         
-        serializer = ProductSerializer(products, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        serializer = compiled_product_serializer.project(*get_fieldset_params(request))
+        paginator = KeysetCursorPagination(ordering=ordering)
+        page = paginator.paginate_queryset(
+            serializer.values_list(products, extra=paginator.required_fields()),
+            request,
+            view=self,
+        )
+        return paginator.get_paginated_response(serializer.to_representation(page))
 
 
 class ProductDetailView(APIView):
@@ -41,19 +85,147 @@ class ProductDetailView(APIView):
     """
     
     @product_detail_decorator
+    @conditional_catalog_response(product_state, use_last_modified=True)
     def get(self, request, pk):
-        product = get_object_or_404(Product, pk=pk, is_active=True)
-        serializer = ProductSerializer(product)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        serializer = compiled_product_serializer.project(*get_fieldset_params(request))
+        detail = get_product_detail(pk)
+        if detail is None:
+            raise Http404
+        return Response(
+            serializer.narrow(detail[0]),
+            status=status.HTTP_200_OK
+        )
+
+
+class ProductBatchView(APIView):
+    """
+    GET: Obtener varios productos activos por ID en una sola petición
+    """
+    
+    @product_batch_decorator
+    @conditional_catalog_response(catalog_state)
+    @cache_catalog_response('batch')
+    def get(self, request):
+        ids = parse_id_list(request.query_params.get('ids'), settings.PRODUCTS_BATCH_MAX_IDS)
+        serializer = compiled_product_serializer.project(*get_fieldset_params(request))
+        results, missing = get_products_by_ids(
+            Product.objects.filter(is_active=True), ids, serializer
+        )
+        return Response(
+            {'results': results, 'missing': missing},
+            status=status.HTTP_200_OK
+        )
 
 
 class ProductActiveView(APIView):
     """
-    GET: Obtener productos activos con stock disponible
+    GET: Obtener productos activos con stock disponible (paginado por cursor)
     """
     
     @product_active_decorator
+    @conditional_catalog_response(catalog_state)
+    @cache_catalog_response('active')
     def get(self, request):
         products = Product.objects.filter(is_active=True, stock__gt=0)
-        serializer = ProductSerializer(products, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        serializer = compiled_product_serializer.project(*get_fieldset_params(request))
+        paginator = KeysetCursorPagination(ordering='-created_at')
+        page = paginator.paginate_queryset(
+            serializer.values_list(products, extra=paginator.required_fields()),
+            request,
+            view=self,
+        )
+        return paginator.get_paginated_response(serializer.to_representation(page))
+
+
+class ProductSuggestView(APIView):
+    """
+    GET: Sugerencias de autocompletado por prefijo del nombre
+    """
+    
+    @product_suggest_decorator
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', settings.PRODUCTS_SUGGEST_LIMIT))
+        except ValueError:
+            return Response(
+                {'error': 'El parámetro limit debe ser un número entero'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = max(1, min(limit, settings.PRODUCTS_SUGGEST_MAX_LIMIT))
+        
+        query = request.query_params.get('q', '')
+        return Response(
+            {'results': get_suggest_index().search(query, limit)},
+            status=status.HTTP_200_OK
+        )
+
+
+class ProductFacetsView(APIView):
+    """
+    GET: Histograma de precios y conteos de stock de los productos activos
+    que cumplen los mismos filtros que el listado
+    """
+    
+    @product_facets_decorator
+    @conditional_catalog_response(catalog_state)
+    @cache_catalog_response('facets')
+    def get(self, request):
+        filters = ProductFacetsSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+        products = filter_products(Product.objects.filter(is_active=True), filters.validated_data)
+        
+        search = request.query_params.get('search', None)
+        if search:
+            products = search_products(products, search)
+        
+        return Response(
+            product_facets(products, filters.validated_data['interval']),
+            status=status.HTTP_200_OK
+        )
+
+
+class ProductCacheStatsView(APIView):
+    """
+    GET: Contadores de aciertos/fallos de la caché del catálogo
+    """
+    permission_classes = [IsAdminUser]
+    
+    @product_cache_stats_decorator
+    def get(self, request):
+        return Response(get_cache_stats(), status=status.HTTP_200_OK)
+
+
+class ProductExportView(APIView):
+    """
+    GET: Exportar el catálogo activo completo en streaming (NDJSON o JSON)
+    """
+    
+    @product_export_decorator
+    def get(self, request):
+        export_format = request.query_params.get('output', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f'Formato no soportado. Opciones: {", ".join(EXPORT_FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        content = (
+            chunk.encode('utf-8')
+            for chunk in iter_product_export(
+                Product.objects.filter(is_active=True),
+                export_format=export_format,
+                chunk_size=settings.PRODUCTS_EXPORT_CHUNK_SIZE,
+            )
+        )
+        
+        # Compresión al vuelo si el cliente la acepta
+        gzip = bool(re_accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+        if gzip:
+            content = compress_sequence(content)
+        
+        response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[export_format])
+        response['Content-Disposition'] = f'attachment; filename="products.{export_format}"'
+        if gzip:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
\ No newline at end of file